@@ -2,9 +2,15 @@
 LLM-based Natural Language Requirement Analyzer
 Uses Gemini API to understand and extract structured information from user requirements.
 """
+import asyncio
 from dataclasses import dataclass, field
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from llm_client import GeminiClient
+from prompt_cache import PromptCache
+
+
+# Requirements whose TDL is reused by analyze_and_generate
+_RESULT_CACHE_FILE = "results.sqlite"
 
 
 @dataclass
@@ -51,14 +57,39 @@ class RequirementAnalysis:
 class LLMRequirementAnalyzer:
     """Analyzes natural language requirements using LLM."""
 
-    def __init__(self, api_key: str = None):
+    def __init__(
+        self,
+        api_key: str = None,
+        max_concurrency: int = 4,
+        cache_threshold: Optional[float] = None,
+        cache_path: Optional[str] = None,
+        result_cache: bool = False,
+        response_cache: bool = True
+    ):
         """
         Initialize analyzer with LLM client.
 
         Args:
             api_key: Gemini API key. If None, reads from environment.
+            max_concurrency: Maximum number of concurrent LLM calls in analyze_batch
+            cache_threshold: Minimum similarity to also reuse the analysis of
+                a similar requirement
+            cache_path: SQLite file to keep analyses in between runs. Without
+                a threshold or path, only the GeminiClient's exact-match
+                cache is used.
+            result_cache: Keep analyze_and_generate results on disk (next to
+                the Gemini response cache) and reuse them for the same
+                requirement (ignoring case and whitespace) and model
+            response_cache: Reuse cached LLM responses for identical prompts
         """
-        self.llm_client = GeminiClient(api_key)
+        self.llm_client = GeminiClient(api_key, response_cache=response_cache)
+        self.max_concurrency = max_concurrency
+        self.cache = None
+        if cache_threshold is not None or cache_path is not None:
+            self.cache = PromptCache(
+                cache_path or ":memory:", scope=self.llm_client.model, threshold=cache_threshold
+            )
+        self.result_cache = self._open_result_cache() if result_cache else None
 
     def analyze(self, user_input: str) -> RequirementAnalysis:
         """
@@ -76,19 +107,16 @@ class LLMRequirementAnalyzer:
         print("\n[LLM] LLM analyzing requirement...")
 
         try:
+            # Reuse analysis of an identical (or, if enabled, similar) requirement
+            result = self._lookup_cache(user_input)
+            if result is not None:
+                print("[CACHE] Reusing analysis of a cached requirement")
+                return self._build_analysis(result, user_input)
+
             # Call LLM to analyze requirement
             result = self.llm_client.analyze_requirement(user_input)
-
-            # Create RequirementAnalysis object
-            analysis = RequirementAnalysis(
-                actions=result.get("actions", []),
-                objects=result.get("objects", []),
-                locations=result.get("locations", []),
-                constraints=result.get("constraints", []),
-                coordinates=result.get("coordinates", {}),  # NEW: Extract coordinates
-                task_description=result.get("task_description", ""),
-                raw_input=user_input
-            )
+            self._cache_analysis(user_input, result)
+            analysis = self._build_analysis(result, user_input)
 
             print("[OK] LLM analysis completed")
             return analysis
@@ -96,6 +124,192 @@ class LLMRequirementAnalyzer:
         except Exception as e:
             raise Exception(f"LLM requirement analysis failed: {e}")
 
+    def analyze_and_generate(
+        self,
+        user_input: str,
+        explain: bool = False
+    ) -> Tuple[RequirementAnalysis, str, Optional[str]]:
+        """
+        Analyze user requirement and generate its TDL document (and
+        optionally an explanation) in a single LLM request.
+
+        Args:
+            user_input: Natural language requirement (Korean or English)
+            explain: Also generate a human-readable explanation of the TDL
+
+        Returns:
+            Tuple of (analysis, raw TDL document, explanation or None)
+
+        Raises:
+            Exception: If the LLM request fails
+        """
+        print("\n[LLM] LLM analyzing requirement and generating TDL...")
+
+        cached = self._lookup_result(user_input, explain)
+        if cached is not None:
+            print("[CACHE] Reusing TDL of an identical requirement")
+            return cached
+
+        try:
+            result = self.llm_client.analyze_generate_explain(
+                user_input, explain=explain, cache=self.result_cache is not None
+            )
+            output = self._store_result(user_input, result)
+
+            print("[OK] LLM analysis and TDL generation completed")
+            return output
+
+        except Exception as e:
+            raise Exception(f"LLM requirement analysis failed: {e}")
+
+    async def aanalyze_and_generate(
+        self,
+        user_input: str,
+        explain: bool = False
+    ) -> Tuple[RequirementAnalysis, str, Optional[str]]:
+        """
+        Asynchronous version of analyze_and_generate.
+
+        Only the LLM request runs outside the event loop thread; the caches
+        are used from the calling thread.
+
+        Args:
+            user_input: Natural language requirement (Korean or English)
+            explain: Also generate a human-readable explanation of the TDL
+
+        Returns:
+            Tuple of (analysis, raw TDL document, explanation or None)
+
+        Raises:
+            Exception: If the LLM request fails
+        """
+        cached = self._lookup_result(user_input, explain)
+        if cached is not None:
+            return cached
+
+        try:
+            result = await self.llm_client.aanalyze_generate_explain(
+                user_input, explain=explain, cache=self.result_cache is not None
+            )
+            return self._store_result(user_input, result)
+        except Exception as e:
+            raise Exception(f"LLM requirement analysis failed: {e}")
+
+    def _lookup_result(
+        self,
+        user_input: str,
+        explain: bool
+    ) -> Optional[Tuple[RequirementAnalysis, str, Optional[str]]]:
+        """Look up analyze_and_generate result of an identical requirement."""
+        if self.result_cache is None:
+            return None
+
+        result = self.result_cache.get(user_input)
+        if result is None:
+            return None
+
+        # An entry stored without explanation still provides the TDL
+        analysis = self._build_analysis(result["analysis"], user_input)
+        return analysis, result["tdl"], result.get("explanation") if explain else None
+
+    def _store_result(
+        self,
+        user_input: str,
+        result: dict
+    ) -> Tuple[RequirementAnalysis, str, Optional[str]]:
+        """Cache analyze_and_generate LLM result and unpack it."""
+        self._cache_analysis(user_input, result["analysis"])
+        if self.result_cache is not None:
+            self.result_cache.put(user_input, result)
+
+        analysis = self._build_analysis(result["analysis"], user_input)
+        return analysis, result["tdl"], result.get("explanation")
+
+    async def aanalyze(self, user_input: str) -> RequirementAnalysis:
+        """
+        Analyze user requirement using LLM without blocking the event loop.
+
+        Args:
+            user_input: Natural language requirement (Korean or English)
+
+        Returns:
+            RequirementAnalysis object with extracted information
+
+        Raises:
+            Exception: If LLM analysis fails
+        """
+        try:
+            result = self._lookup_cache(user_input)
+            if result is None:
+                result = await self.llm_client.aanalyze_requirement(user_input)
+                self._cache_analysis(user_input, result)
+            return self._build_analysis(result, user_input)
+        except Exception as e:
+            raise Exception(f"LLM requirement analysis failed: {e}")
+
+    def analyze_batch(self, user_inputs: List[str]) -> List[RequirementAnalysis]:
+        """
+        Analyze several requirements concurrently.
+
+        Args:
+            user_inputs: Natural language requirements
+
+        Returns:
+            RequirementAnalysis objects in the same order as user_inputs
+
+        Raises:
+            Exception: If any LLM analysis fails
+        """
+        print(f"\n[LLM] LLM analyzing {len(user_inputs)} requirements...")
+
+        async def run_all():
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def run_one(user_input):
+                async with semaphore:
+                    return await self.aanalyze(user_input)
+
+            return await asyncio.gather(*(run_one(x) for x in user_inputs))
+
+        analyses = asyncio.run(run_all())
+
+        print("[OK] LLM analysis completed")
+        return list(analyses)
+
+    def _open_result_cache(self) -> Optional[PromptCache]:
+        """Open on-disk result cache, or None if it cannot be created."""
+        path = self.llm_client.cache_dir / _RESULT_CACHE_FILE
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            return PromptCache(str(path), scope=self.llm_client.model)
+        except Exception as e:
+            print(f"[WARNING]  Warning: Result cache disabled: {e}")
+            return None
+
+    def _lookup_cache(self, user_input: str) -> Optional[dict]:
+        """Check the LLM response cache first, then the analysis cache."""
+        result = self.llm_client.get_cached_analysis(user_input)
+        if result is None and self.cache is not None:
+            result = self.cache.get(user_input)
+        return result
+
+    def _cache_analysis(self, user_input: str, result: dict):
+        """Store analysis in the analysis cache, if one is configured."""
+        if self.cache is not None:
+            self.cache.put(user_input, result)
+
+    def _build_analysis(self, result: dict, user_input: str) -> RequirementAnalysis:
+        """Create RequirementAnalysis object from LLM result."""
+        return RequirementAnalysis(
+            actions=result.get("actions", []),
+            objects=result.get("objects", []),
+            locations=result.get("locations", []),
+            constraints=result.get("constraints", []),
+            coordinates=result.get("coordinates", {}),  # NEW: Extract coordinates
+            task_description=result.get("task_description", ""),
+            raw_input=user_input
+        )
+
     def validate_analysis(self, analysis: RequirementAnalysis) -> bool:
         """
         Validate that the analysis has sufficient information.
@@ -118,6 +332,43 @@ class LLMRequirementAnalyzer:
 
         return True
 
+    def apply_corrections(
+        self,
+        analysis: RequirementAnalysis,
+        corrections: Dict[str, str]
+    ) -> RequirementAnalysis:
+        """
+        Apply corrections to the analysis without prompting.
+
+        Args:
+            analysis: Analysis result to correct
+            corrections: Field name (actions, objects, locations, constraints,
+                task_description) mapped to corrected text. List fields are
+                comma-separated; empty text leaves the field unchanged.
+
+        Returns:
+            Corrected analysis
+
+        Raises:
+            ValueError: If a field name is unknown
+        """
+        for field_name, text in corrections.items():
+            self._apply_correction(analysis, field_name, text)
+        return analysis
+
+    def _apply_correction(self, analysis: RequirementAnalysis, field_name: str, text: str):
+        """Apply a single field correction."""
+        text = text.strip()
+        if not text:
+            return
+
+        if field_name in ("actions", "objects", "locations", "constraints"):
+            setattr(analysis, field_name, [item.strip() for item in text.split(",")])
+        elif field_name == "task_description":
+            analysis.task_description = text
+        else:
+            raise ValueError(f"Unknown analysis field: {field_name}")
+
     def interactive_correction(self, analysis: RequirementAnalysis) -> RequirementAnalysis:
         """
         Allow user to interactively correct the analysis.
@@ -134,6 +385,15 @@ class LLMRequirementAnalyzer:
         print(analysis.summary())
         print("="*60)
 
+        # Menu choice -> (field name, prompt)
+        edit_choices = {
+            "1": ("actions", "Actions (comma-separated): "),
+            "2": ("objects", "Objects (comma-separated): "),
+            "3": ("locations", "Locations (comma-separated): "),
+            "4": ("constraints", "Constraints (comma-separated): "),
+            "5": ("task_description", "Task Description: "),
+        }
+
         while True:
             user_input = input("\nIs this correct? (yes/no/edit): ").strip().lower()
 
@@ -142,21 +402,13 @@ class LLMRequirementAnalyzer:
             elif user_input in ["no", "n"]:
                 print("\nPlease provide the corrected information:")
 
-                actions_input = input(f"Actions (current: {', '.join(analysis.actions)}): ").strip()
-                if actions_input:
-                    analysis.actions = [a.strip() for a in actions_input.split(",")]
-
-                objects_input = input(f"Objects (current: {', '.join(analysis.objects)}): ").strip()
-                if objects_input:
-                    analysis.objects = [o.strip() for o in objects_input.split(",")]
-
-                locations_input = input(f"Locations (current: {', '.join(analysis.locations)}): ").strip()
-                if locations_input:
-                    analysis.locations = [l.strip() for l in locations_input.split(",")]
-
-                constraints_input = input(f"Constraints (current: {', '.join(analysis.constraints)}): ").strip()
-                if constraints_input:
-                    analysis.constraints = [c.strip() for c in constraints_input.split(",")]
+                corrections = {
+                    "actions": input(f"Actions (current: {', '.join(analysis.actions)}): "),
+                    "objects": input(f"Objects (current: {', '.join(analysis.objects)}): "),
+                    "locations": input(f"Locations (current: {', '.join(analysis.locations)}): "),
+                    "constraints": input(f"Constraints (current: {', '.join(analysis.constraints)}): "),
+                }
+                self.apply_corrections(analysis, corrections)
 
                 print("\n[OK] Analysis updated")
                 print(analysis.summary())
@@ -169,26 +421,9 @@ class LLMRequirementAnalyzer:
                 print("5. Task Description")
                 choice = input("Enter number: ").strip()
 
-                if choice == "1":
-                    actions_input = input(f"Actions (comma-separated): ").strip()
-                    if actions_input:
-                        analysis.actions = [a.strip() for a in actions_input.split(",")]
-                elif choice == "2":
-                    objects_input = input(f"Objects (comma-separated): ").strip()
-                    if objects_input:
-                        analysis.objects = [o.strip() for o in objects_input.split(",")]
-                elif choice == "3":
-                    locations_input = input(f"Locations (comma-separated): ").strip()
-                    if locations_input:
-                        analysis.locations = [l.strip() for l in locations_input.split(",")]
-                elif choice == "4":
-                    constraints_input = input(f"Constraints (comma-separated): ").strip()
-                    if constraints_input:
-                        analysis.constraints = [c.strip() for c in constraints_input.split(",")]
-                elif choice == "5":
-                    desc_input = input(f"Task Description: ").strip()
-                    if desc_input:
-                        analysis.task_description = desc_input
+                if choice in edit_choices:
+                    field_name, prompt = edit_choices[choice]
+                    self.apply_corrections(analysis, {field_name: input(prompt)})
 
                 print("\n[OK] Field updated")
                 print(analysis.summary())
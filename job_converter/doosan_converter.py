@@ -2,8 +2,15 @@
 Doosan DRL (Doosan Robotics Language) Converter
 Converts TDL to Doosan DRL (Python-based) code.
 """
-from typing import List, Dict
-from tdl_parser import TDLProgram, TDLGoal, TDLCommand
+import io
+import re
+from functools import lru_cache
+from typing import Dict, TextIO
+from tdl_parser import TDLProgram, TDLGoal
+
+
+_POSE_RE = re.compile(r'(posx|posj)\(', re.IGNORECASE)
+_DEFAULT_POSE = "posx(0, 0, 0, 0, 0, 0)"
 
 
 class DoosanConverter:
@@ -15,82 +22,43 @@ class DoosanConverter:
 
     def convert(self, program: TDLProgram) -> str:
         """Convert TDL program to Doosan DRL."""
-        lines = []
+        out = io.StringIO()
+        self.convert_to(program, out)
+        return out.getvalue()
 
+    def convert_to(self, program: TDLProgram, out: TextIO):
+        """Convert TDL program to Doosan DRL, writing to a text stream."""
         # Header
-        lines.append("# Doosan DRL Script")
-        lines.append("# Generated from TDL")
-        lines.append("")
+        out.write("# Doosan DRL Script\n"
+                  "# Generated from TDL\n")
 
         # Convert each goal
         for goal in program.goals:
-            goal_code = self._convert_goal(goal)
-            lines.extend(goal_code)
-            lines.append("")
-
-        return "\n".join(lines)
+            out.write("\n")
+            self._convert_goal(goal, out)
 
-    def _convert_goal(self, goal: TDLGoal) -> List[str]:
+    def _convert_goal(self, goal: TDLGoal, out: TextIO):
         """Convert TDL goal to DRL function."""
-        lines = []
-
         # Function definition
-        lines.append(f"def {goal.name}():")
+        out.write(f"def {goal.name}():\n")
 
         if not goal.commands:
-            lines.append("    pass")
-            return lines
+            out.write("    pass\n")
+            return
 
         # Convert commands
-        for command in goal.commands:
-            cmd_line = self._convert_command(command)
+        for cmd_type, args in zip(goal.cmd_types, goal.cmd_args):
+            cmd_line = self._convert_command(cmd_type, args)
             if cmd_line:
-                lines.append(f"    {cmd_line}")
-
-        return lines
+                out.write(f"    {cmd_line}\n")
 
-    def _convert_command(self, command: TDLCommand) -> str:
+    def _convert_command(self, cmd_type: str, args: Dict) -> str:
         """Convert single TDL command to DRL."""
-        cmd_type = command.command_type
-        args = command.args
-
-        # Move commands
-        if cmd_type == "MoveLinear":
-            return self._convert_move_linear(args)
-        elif cmd_type == "MoveJoint":
-            return self._convert_move_joint(args)
-        elif cmd_type == "MoveCircular":
-            return self._convert_move_circular(args)
-
-        # I/O commands
-        elif cmd_type == "SetDigitalOutput":
-            port = args.get("port", 0)
-            value = args.get("value", 0)
-            return f"set_digital_output({port}, {value})"
-
-        elif cmd_type == "GetDigitalInput":
-            port = args.get("port", 0)
-            return f"get_digital_input({port})"
-
-        # Time commands
-        elif cmd_type == "Delay":
-            duration = args.get("duration_sec", args.get("duration", 0))
-            return f"wait({duration})"
-
-        # Welding commands
-        elif cmd_type == "ArcOn":
-            return "# Arc welding ON - implement with vendor-specific command"
-
-        elif cmd_type == "ArcOff":
-            return "# Arc welding OFF - implement with vendor-specific command"
-
-        # Control flow
-        elif cmd_type == "End":
-            return "return"
-
-        # Unknown command
-        else:
+        handler = self._HANDLERS.get(cmd_type)
+        if handler is None:
+            # Unknown command
             return f"# TODO: {cmd_type}({args})"
+        return handler(self, args)
 
     def _convert_move_linear(self, args: Dict) -> str:
         """Convert MoveLinear to DRL movel."""
@@ -119,52 +87,96 @@ class DoosanConverter:
 
         return f"movec({via_pose}, {target_pose}, v={velocity}, a={acceleration})"
 
-    def _extract_pose(self, pose_str: str) -> str:
+    # I/O commands
+    def _convert_set_digital_output(self, args: Dict) -> str:
+        """Convert SetDigitalOutput to DRL set_digital_output."""
+        port = args.get("port", 0)
+        value = args.get("value", 0)
+        return f"set_digital_output({port}, {value})"
+
+    def _convert_get_digital_input(self, args: Dict) -> str:
+        """Convert GetDigitalInput to DRL get_digital_input."""
+        port = args.get("port", 0)
+        return f"get_digital_input({port})"
+
+    # Time commands
+    def _convert_delay(self, args: Dict) -> str:
+        """Convert Delay to DRL wait."""
+        duration = args.get("duration_sec", args.get("duration", 0))
+        return f"wait({duration})"
+
+    # Welding commands
+    def _convert_arc_on(self, args: Dict) -> str:
+        """Convert ArcOn (no DRL equivalent)."""
+        return "# Arc welding ON - implement with vendor-specific command"
+
+    def _convert_arc_off(self, args: Dict) -> str:
+        """Convert ArcOff (no DRL equivalent)."""
+        return "# Arc welding OFF - implement with vendor-specific command"
+
+    # Control flow
+    def _convert_end(self, args: Dict) -> str:
+        """Convert End to DRL return."""
+        return "return"
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _extract_pose(pose_str: str) -> str:
         """Extract pose from TDL format."""
         if not pose_str:
-            return "posx(0, 0, 0, 0, 0, 0)"
+            return _DEFAULT_POSE
 
-        # If already in correct format, return as-is
-        if pose_str.startswith('posx(') or pose_str.startswith('posj('):
+        # PosX/PosJ -> DRL posx/posj
+        if _POSE_RE.match(pose_str):
             return pose_str.lower()
 
         # If tuple format, convert
-        if pose_str.startswith('(') and pose_str.endswith(')'):
-            # Extract numbers
-            coords = pose_str.strip('()').split(',')
-            coords = [c.strip() for c in coords]
-            return f"posx({', '.join(coords)})"
+        if pose_str[0] == '(' and pose_str[-1] == ')':
+            return f"posx({pose_str[1:-1]})"
 
         return pose_str
 
+    # Command type -> converter method
+    _HANDLERS = {
+        "MoveLinear": _convert_move_linear,
+        "MoveJoint": _convert_move_joint,
+        "MoveCircular": _convert_move_circular,
+        "SetDigitalOutput": _convert_set_digital_output,
+        "GetDigitalInput": _convert_get_digital_input,
+        "Delay": _convert_delay,
+        "ArcOn": _convert_arc_on,
+        "ArcOff": _convert_arc_off,
+        "End": _convert_end,
+    }
+
 
 class DoosanJobGenerator:
     """Generates complete Doosan job file."""
 
     def generate(self, program: TDLProgram) -> str:
         """Generate complete DRL job file."""
-        converter = DoosanConverter()
+        out = io.StringIO()
+        self.generate_to(program, out)
+        return out.getvalue()
 
-        lines = []
+    def generate_to(self, program: TDLProgram, fp: TextIO):
+        """Generate complete DRL job file, writing to a text stream."""
+        converter = DoosanConverter()
 
         # File header
-        lines.append("#!/usr/bin/env python")
-        lines.append("# -*- coding: utf-8 -*-")
-        lines.append("")
-        lines.append("# Doosan Robot Job File")
-        lines.append("# Auto-generated from TDL")
-        lines.append("")
+        fp.write("#!/usr/bin/env python\n"
+                 "# -*- coding: utf-8 -*-\n"
+                 "\n"
+                 "# Doosan Robot Job File\n"
+                 "# Auto-generated from TDL\n"
+                 "\n")
 
         # Convert program
-        drl_code = converter.convert(program)
-        lines.append(drl_code)
-        lines.append("")
-
+        converter.convert_to(program, fp)
         # Main execution
-        lines.append("# Main execution")
-        lines.append("if __name__ == '__main__':")
+        fp.write("\n\n"
+                 "# Main execution\n"
+                 "if __name__ == '__main__':")
 
         for goal in program.goals:
-            lines.append(f"    {goal.name}()")
-
-        return "\n".join(lines)
+            fp.write(f"\n    {goal.name}()")
@@ -7,14 +7,16 @@ Usage:
     python main.py input.tdl --robot universal -o output.script
     python main.py input.tdl --auto  # Auto-detect from robot_selector
 """
-import argparse
 import sys
+import io
+import os
 import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
 from pathlib import Path
+from typing import Optional, Tuple
 
 from tdl_parser import TDLParser
-from doosan_converter import DoosanJobGenerator
-from universal_converter import UniversalJobGenerator
 
 
 def print_banner():
@@ -62,18 +64,23 @@ def detect_robot_from_report(tdl_file_path: Path) -> str:
 def convert_tdl(
     tdl_file: Path,
     robot: str,
-    output_file: Path = None
-) -> str:
+    output_file: Path = None,
+    print_only: bool = False
+) -> Optional[str]:
     """
     Convert TDL file to robot-specific code.
 
+    The generated code is streamed directly into the output file; it is only
+    built in memory when print_only is set.
+
     Args:
         tdl_file: Input TDL file path
         robot: Robot manufacturer ('doosan', 'universal', etc.)
         output_file: Output file path (optional)
+        print_only: Return generated code instead of saving it
 
     Returns:
-        Generated code as string
+        Generated code as string if print_only, otherwise None
     """
     # Parse TDL
     print(f"\n[1/3] Parsing TDL file: {tdl_file.name}")
@@ -90,18 +97,22 @@ def convert_tdl(
     print(f"\n[2/3] Converting to {robot.upper()} code...")
 
     try:
+        # Import only the generator that is actually used
         if robot == 'doosan':
+            from doosan_converter import DoosanJobGenerator
             generator = DoosanJobGenerator()
-            code = generator.generate(program)
             default_ext = '.drl'
         elif robot == 'universal':
+            from universal_converter import UniversalJobGenerator
             generator = UniversalJobGenerator()
-            code = generator.generate(program)
             default_ext = '.script'
         else:
             raise ValueError(f"Unsupported robot: {robot}")
 
-        print(f"[OK] Conversion completed ({len(code)} characters)")
+        if print_only:
+            code = generator.generate(program)
+            print(f"[OK] Conversion completed ({len(code)} characters)")
+            return code
     except Exception as e:
         print(f"[ERROR] Failed to convert: {e}")
         raise
@@ -113,21 +124,57 @@ def convert_tdl(
         # Auto-generate output filename
         output_file = tdl_file.with_suffix(default_ext)
 
+    # Generate into a temporary file next to the output, so a failed
+    # conversion leaves an existing output file untouched
+    temp_path = output_file.with_name(f".{output_file.name}.{os.getpid()}.tmp")
+
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(code)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            generator.generate_to(program, f)
+        os.replace(temp_path, output_file)
 
         print(f"[OK] Saved to: {output_file}")
         print(f"[INFO] File size: {output_file.stat().st_size} bytes")
     except Exception as e:
-        print(f"[ERROR] Failed to save: {e}")
+        print(f"[ERROR] Failed to convert and save: {e}")
         raise
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+    return None
 
-    return code
+
+def convert_tdl_captured(tdl_file: Path, robot: str) -> Tuple[str, Optional[str]]:
+    """
+    Convert TDL file while capturing console output.
+
+    Used by batch mode so that the log of each conversion is printed as one
+    block instead of interleaving with other workers.
+
+    Args:
+        tdl_file: Input TDL file path
+        robot: Robot manufacturer ('doosan', 'universal', etc.)
+
+    Returns:
+        Tuple of (captured output, error message or None)
+    """
+    buffer = io.StringIO()
+    error = None
+
+    with redirect_stdout(buffer):
+        try:
+            convert_tdl(tdl_file, robot)
+        except Exception as e:
+            error = str(e)
+
+    return buffer.getvalue(), error
 
 
 def main():
     """Main entry point."""
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Job Converter - Convert TDL to robot-specific code",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -181,6 +228,12 @@ Supported Robots:
         type=str,
         help="Batch convert all TDL files in directory"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of parallel workers for batch mode (default: CPU count)"
+    )
     parser.add_argument(
         "--print-only",
         action="store_true",
@@ -188,6 +241,8 @@ Supported Robots:
     )
 
     args = parser.parse_args()
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
 
     # Print banner
     print_banner()
@@ -203,7 +258,10 @@ Supported Robots:
             print("[ERROR] --robot is required for batch mode")
             sys.exit(1)
 
-        tdl_files = list(batch_dir.glob("*.tdl"))
+        tdl_files = [
+            Path(entry.path) for entry in os.scandir(batch_dir)
+            if entry.name.endswith('.tdl') and entry.is_file()
+        ]
         if not tdl_files:
             print(f"[WARNING] No TDL files found in {batch_dir}")
             sys.exit(0)
@@ -211,18 +269,28 @@ Supported Robots:
         print(f"[INFO] Found {len(tdl_files)} TDL file(s)")
         print()
 
-        for tdl_file in tdl_files:
-            print("="*60)
-            print(f"Converting: {tdl_file.name}")
-            print("="*60)
-
-            try:
-                convert_tdl(tdl_file, args.robot)
-                print()
-            except Exception as e:
-                print(f"[ERROR] Failed: {e}")
+        # Files are independent, so convert them in parallel
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = {
+                executor.submit(convert_tdl_captured, tdl_file, args.robot): tdl_file
+                for tdl_file in tdl_files
+            }
+
+            for future in as_completed(futures):
+                tdl_file = futures[future]
+                print("="*60)
+                print(f"Converting: {tdl_file.name}")
+                print("="*60)
+
+                try:
+                    output, error = future.result()
+                except Exception as e:
+                    output, error = "", str(e)
+
+                print(output, end="")
+                if error:
+                    print(f"[ERROR] Failed: {error}")
                 print()
-                continue
 
         print("[DONE] Batch conversion completed")
         sys.exit(0)
@@ -266,7 +334,7 @@ Supported Robots:
 
     # Convert
     try:
-        code = convert_tdl(tdl_file, robot, output_file)
+        code = convert_tdl(tdl_file, robot, output_file, print_only=args.print_only)
 
         if args.print_only:
             print("\n" + "="*60)
@@ -2,12 +2,40 @@
 TDL Parser
 Parses TDL (Task Description Language) files into structured representation.
 """
+import mmap
+import os
 import re
-from typing import List, Dict, Any, Optional
+import sys
+from typing import List, Dict, Any, Optional, Callable, Iterator
 from dataclasses import dataclass, field
 
 
-@dataclass
+# Precompiled patterns used by TDLParser
+_DEFINE_RE = re.compile(r'DEFINE\s+(\w+)\s*=\s*(.+?);')
+_STATEMENT_PATTERN = (
+    r'^[ \t]*(?:'
+    r'(?P<define>DEFINE[^\n]*)'
+    r'|(?P<goal>GOAL\s+(?P<goal_name>{word}+)\s*\(\s*\))'
+    r'|(?P<spawn>SPAWN[^\n]*)'
+    r')'
+)
+_STATEMENT_RE = re.compile(_STATEMENT_PATTERN.format(word=r'\w'), re.MULTILINE)
+# Same pattern over UTF-8 bytes (non-ASCII bytes count as word characters)
+_STATEMENT_BYTES_RE = re.compile(
+    _STATEMENT_PATTERN.format(word=r'[\w\x80-\xff]').encode('ascii'),
+    re.MULTILINE
+)
+_SPAWN_STRIP_RE = re.compile(r'SPAWN|WITH WAIT|;')
+_SPAWN_CALL_RE = re.compile(r'(\w+)\s*\((.*)\)', re.DOTALL)
+_ARG_RE = re.compile(r'(\w+)\s*=\s*((?:Pos[XJ]\([^)]+\)|[^,]+))')
+_FLOAT_RE = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+
+# A program allocates one TDLCommand per SPAWN line; slots keep them
+# small on Python 3.10+ (the converter still runs on 3.7)
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class TDLCommand:
     """Represents a single TDL command."""
     command_type: str
@@ -18,17 +46,34 @@ class TDLCommand:
         return f"{self.command_type}({self.args})"
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class TDLGoal:
     """Represents a GOAL block in TDL."""
     name: str
     commands: List[TDLCommand] = field(default_factory=list)
 
+    # Parallel arrays of command types and arguments (struct-of-arrays view
+    # of commands, used by the converters' hot loops). Built from commands
+    # on every access, so they always reflect it.
+    @property
+    def cmd_types(self) -> List[str]:
+        """Command types, in command order."""
+        return [command.command_type for command in self.commands]
+
+    @property
+    def cmd_args(self) -> List[Dict[str, Any]]:
+        """Command arguments, in command order."""
+        return [command.args for command in self.commands]
+
+    def add_command(self, command: TDLCommand):
+        """Append command to goal."""
+        self.commands.append(command)
+
     def __str__(self) -> str:
         return f"GOAL {self.name} ({len(self.commands)} commands)"
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class TDLProgram:
     """Represents entire TDL program."""
     goals: List[TDLGoal] = field(default_factory=list)
@@ -50,78 +95,79 @@ class TDLParser:
     """Parser for TDL files."""
 
     def parse_file(self, file_path: str) -> TDLProgram:
-        """Parse TDL file."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        return self.parse(content)
+        """
+        Parse TDL file.
+
+        The file is memory-mapped and scanned as bytes, so only the matched
+        statements are decoded.
+        """
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return TDLProgram()
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return self._parse_statements(
+                    _STATEMENT_BYTES_RE.finditer(mm),
+                    lambda text: text.decode('utf-8')
+                )
 
     def parse(self, tdl_content: str) -> TDLProgram:
         """Parse TDL content."""
+        return self._parse_statements(_STATEMENT_RE.finditer(tdl_content), str)
+
+    def _parse_statements(
+        self,
+        matches: Iterator[re.Match],
+        decode: Callable[[Any], str]
+    ) -> TDLProgram:
+        """Build program from statement matches."""
         program = TDLProgram()
-        lines = tdl_content.split('\n')
-
         current_goal = None
-        i = 0
-
-        while i < len(lines):
-            line = lines[i].strip()
 
-            # Skip empty lines and comments
-            if not line or line.startswith('//') or line.startswith('#'):
-                i += 1
-                continue
+        # Single regex scan over the whole buffer; comment lines, braces
+        # and anything else that is not a statement are never matched.
+        for match in matches:
+            kind = match.lastgroup
 
             # Parse DEFINE statements
-            if line.startswith('DEFINE'):
-                self._parse_define(line, program)
-                i += 1
-                continue
+            if kind == 'define':
+                self._parse_define(decode(match.group('define')), program)
 
             # Parse GOAL declaration
-            if line.startswith('GOAL'):
-                match = re.match(r'GOAL\s+(\w+)\s*\(\s*\)', line)
-                if match:
-                    goal_name = match.group(1)
-                    current_goal = TDLGoal(name=goal_name)
-                    program.goals.append(current_goal)
-                i += 1
-                continue
-
-            # Skip opening/closing braces
-            if line == '{' or line == '}':
-                i += 1
-                continue
+            elif kind == 'goal':
+                current_goal = TDLGoal(name=sys.intern(decode(match.group('goal_name'))))
+                program.goals.append(current_goal)
 
             # Parse SPAWN commands
-            if line.startswith('SPAWN') and current_goal:
-                command = self._parse_spawn_command(line)
+            elif current_goal:
+                command = self._parse_spawn_command(decode(match.group('spawn')))
                 if command:
-                    current_goal.commands.append(command)
-
-            i += 1
+                    current_goal.add_command(command)
 
         return program
 
     def _parse_define(self, line: str, program: TDLProgram):
         """Parse DEFINE statement."""
         # Format: DEFINE Name = Value;
-        match = re.match(r'DEFINE\s+(\w+)\s*=\s*(.+?);', line)
+        match = _DEFINE_RE.match(line)
         if match:
-            name = match.group(1)
+            name = sys.intern(match.group(1))
             value = match.group(2).strip()
             program.definitions[name] = value
 
     def _parse_spawn_command(self, line: str) -> Optional[TDLCommand]:
         """Parse SPAWN command line."""
-        # Remove SPAWN and WITH WAIT
-        line = line.replace('SPAWN', '').replace('WITH WAIT', '').replace(';', '').strip()
+        # Remove SPAWN, WITH WAIT and semicolons in a single pass
+        line = _SPAWN_STRIP_RE.sub('', line).strip()
 
         # Extract command name
-        match = re.match(r'(\w+)\s*\((.*)\)', line, re.DOTALL)
+        match = _SPAWN_CALL_RE.match(line)
         if not match:
             return None
 
-        command_type = match.group(1)
+        # Command types and argument keys come from a small vocabulary, so
+        # intern them to share one string object per name across commands
+        command_type = sys.intern(match.group(1))
         args_str = match.group(2)
 
         # Parse arguments
@@ -137,16 +183,18 @@ class TDLParser:
         """Parse command arguments."""
         args = {}
 
-        if not args_str.strip():
+        # Empty or positional-only arguments (e.g. ArcOn(), Delay(1)) have
+        # no key=value pairs, so skip the regex scan
+        if '=' not in args_str:
             return args
 
         # Handle named arguments (key=value)
         # Updated regex to handle nested parentheses properly
         # Pattern: key = value (where value can contain commas if inside parentheses)
-        pattern = r'(\w+)\s*=\s*((?:Pos[XJ]\([^)]+\)|[^,]+))'
-        matches = re.findall(pattern, args_str)
+        matches = _ARG_RE.findall(args_str)
 
         for key, value in matches:
+            key = sys.intern(key)
             value = value.strip()
 
             # Parse value type
@@ -170,8 +218,4 @@ class TDLParser:
 
     def _is_float(self, value: str) -> bool:
         """Check if string is a float."""
-        try:
-            float(value)
-            return True
-        except ValueError:
-            return False
+        return _FLOAT_RE.fullmatch(value) is not None
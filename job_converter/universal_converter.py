@@ -2,107 +2,98 @@
 Universal Robots UR Script Converter
 Converts TDL to Universal Robots UR Script.
 """
-from typing import List, Dict
-from tdl_parser import TDLProgram, TDLGoal, TDLCommand
+import io
+import math
+from typing import List, Dict, Optional, TextIO
+from tdl_parser import TDLProgram, TDLGoal
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; poses are then converted one by one
+    np = None
+
+
+# Unit conversion factors (multiplication is cheaper than division)
+_MM_TO_M = 0.001
+_DEG_TO_RAD = math.pi / 180.0
+
+# Programs with more distinct poses than this convert them with NumPy in bulk
+_VECTORIZE_MIN_POSES = 64
+# Converted poses kept per converter before the memo is reset
+_POSE_CACHE_SIZE = 1024
+_POSE_KEYS = ("target_pose", "via_pose")
+_POSX_FORMAT = "p[%.6f, %.6f, %.6f, %.6f, %.6f, %.6f]"
+_POSJ_FORMAT = "[%.6f, %.6f, %.6f, %.6f, %.6f, %.6f]"
 
 
 class UniversalConverter:
     """Converts TDL to UR Script."""
 
+    def __init__(self):
+        # Pose string -> UR Script pose (LLM-generated TDL repeats poses a
+        # lot); filled in bulk for large programs, otherwise on first use
+        self._pose_cache: Dict[str, str] = {}
+
     def convert(self, program: TDLProgram) -> str:
         """Convert TDL program to UR Script."""
-        lines = []
+        out = io.StringIO()
+        self.convert_to(program, out)
+        return out.getvalue()
+
+    def convert_to(self, program: TDLProgram, out: TextIO):
+        """Convert TDL program to UR Script, writing to a text stream."""
+        if len(self._pose_cache) > _POSE_CACHE_SIZE:
+            self._pose_cache.clear()
+        self._pose_cache.update(self._convert_poses_vectorized(program))
 
         # Header
-        lines.append("# Universal Robots UR Script")
-        lines.append("# Generated from TDL")
-        lines.append("")
+        out.write("# Universal Robots UR Script\n"
+                  "# Generated from TDL\n"
+                  "\n")
 
-        # Convert each goal to a thread/function
+        # Convert each goal to a thread/function, collecting the main
+        # program calls in the same pass
+        mains = io.StringIO()
         for goal in program.goals:
-            goal_code = self._convert_goal(goal)
-            lines.extend(goal_code)
-            lines.append("")
+            self._convert_goal(goal, out)
+            out.write("\n")
+            mains.write(f"\n{goal.name}()")
 
         # Main program
-        lines.append("# Main program")
-        for goal in program.goals:
-            lines.append(f"{goal.name}()")
-
-        return "\n".join(lines)
+        out.write("# Main program")
+        out.write(mains.getvalue())
 
-    def _convert_goal(self, goal: TDLGoal) -> List[str]:
+    def _convert_goal(self, goal: TDLGoal, out: TextIO):
         """Convert TDL goal to UR Script function."""
-        lines = []
-
         # Function definition
-        lines.append(f"def {goal.name}():")
+        out.write(f"def {goal.name}():\n")
 
         if not goal.commands:
-            lines.append("  # No commands")
-            return lines
+            out.write("  # No commands\n")
+            return
 
         # Convert commands
-        for command in goal.commands:
-            cmd_line = self._convert_command(command)
+        for cmd_type, args in zip(goal.cmd_types, goal.cmd_args):
+            cmd_line = self._convert_command(cmd_type, args)
             if cmd_line:
-                lines.append(f"  {cmd_line}")
-
-        lines.append("end")
+                out.write(f"  {cmd_line}\n")
 
-        return lines
+        out.write("end\n")
 
-    def _convert_command(self, command: TDLCommand) -> str:
+    def _convert_command(self, cmd_type: str, args: Dict) -> str:
         """Convert single TDL command to UR Script."""
-        cmd_type = command.command_type
-        args = command.args
-
-        # Move commands
-        if cmd_type == "MoveLinear":
-            return self._convert_move_linear(args)
-        elif cmd_type == "MoveJoint":
-            return self._convert_move_joint(args)
-        elif cmd_type == "MoveCircular":
-            return self._convert_move_circular(args)
-
-        # I/O commands
-        elif cmd_type == "SetDigitalOutput":
-            port = args.get("port", 0)
-            value = args.get("value", 0)
-            # UR uses True/False for digital outputs
-            value_str = "True" if value else "False"
-            return f"set_digital_out({port}, {value_str})"
-
-        elif cmd_type == "GetDigitalInput":
-            port = args.get("port", 0)
-            return f"get_digital_in({port})"
-
-        # Time commands
-        elif cmd_type == "Delay":
-            duration = args.get("duration_sec", args.get("duration", 0))
-            return f"sleep({duration})"
-
-        # Welding commands
-        elif cmd_type == "ArcOn":
-            return "# Arc welding ON - implement with vendor-specific command"
-
-        elif cmd_type == "ArcOff":
-            return "# Arc welding OFF - implement with vendor-specific command"
-
-        # Control flow
-        elif cmd_type == "End":
-            return "# End"
-
-        # Unknown command
-        else:
+        handler = self._HANDLERS.get(cmd_type)
+        if handler is None:
+            # Unknown command
             return f"# TODO: {cmd_type}({args})"
+        return handler(self, args)
 
     def _convert_move_linear(self, args: Dict) -> str:
         """Convert MoveLinear to UR Script movel."""
         pose = self._extract_pose(args.get("target_pose", ""))
-        velocity = args.get("velocity", 100) / 1000.0  # Convert mm/s to m/s
-        acceleration = args.get("acceleration", 50) / 1000.0  # Convert mm/s² to m/s²
-        radius = args.get("blending_radius", 0) / 1000.0  # Convert mm to m
+        velocity = args.get("velocity", 100) * _MM_TO_M  # Convert mm/s to m/s
+        acceleration = args.get("acceleration", 50) * _MM_TO_M  # Convert mm/s² to m/s²
+        radius = args.get("blending_radius", 0) * _MM_TO_M  # Convert mm to m
 
         return f"movel({pose}, a={acceleration:.3f}, v={velocity:.3f}, r={radius:.3f})"
 
@@ -123,46 +114,86 @@ class UniversalConverter:
         """Convert MoveCircular to UR Script movec."""
         via_pose = self._extract_pose(args.get("via_pose", ""))
         target_pose = self._extract_pose(args.get("target_pose", ""))
-        velocity = args.get("velocity", 100) / 1000.0
-        acceleration = args.get("acceleration", 50) / 1000.0
+        velocity = args.get("velocity", 100) * _MM_TO_M
+        acceleration = args.get("acceleration", 50) * _MM_TO_M
 
         return f"movec({via_pose}, {target_pose}, a={acceleration:.3f}, v={velocity:.3f})"
 
+    # I/O commands
+    def _convert_set_digital_output(self, args: Dict) -> str:
+        """Convert SetDigitalOutput to UR Script set_digital_out."""
+        port = args.get("port", 0)
+        value = args.get("value", 0)
+        # UR uses True/False for digital outputs
+        value_str = "True" if value else "False"
+        return f"set_digital_out({port}, {value_str})"
+
+    def _convert_get_digital_input(self, args: Dict) -> str:
+        """Convert GetDigitalInput to UR Script get_digital_in."""
+        port = args.get("port", 0)
+        return f"get_digital_in({port})"
+
+    # Time commands
+    def _convert_delay(self, args: Dict) -> str:
+        """Convert Delay to UR Script sleep."""
+        duration = args.get("duration_sec", args.get("duration", 0))
+        return f"sleep({duration})"
+
+    # Welding commands
+    def _convert_arc_on(self, args: Dict) -> str:
+        """Convert ArcOn (no UR Script equivalent)."""
+        return "# Arc welding ON - implement with vendor-specific command"
+
+    def _convert_arc_off(self, args: Dict) -> str:
+        """Convert ArcOff (no UR Script equivalent)."""
+        return "# Arc welding OFF - implement with vendor-specific command"
+
+    # Control flow
+    def _convert_end(self, args: Dict) -> str:
+        """Convert End (no-op in UR Script)."""
+        return "# End"
+
     def _extract_pose(self, pose_str: str) -> str:
         """Extract and convert pose to UR Script format."""
         if not pose_str:
             return "p[0, 0, 0, 0, 0, 0]"
 
+        converted = self._pose_cache.get(pose_str)
+        if converted is None:
+            converted = self._pose_cache[pose_str] = self._convert_pose(pose_str)
+        return converted
+
+    @staticmethod
+    def _convert_pose(pose_str: str) -> str:
+        """Convert PosX/PosJ pose to UR Script format."""
         # PosX -> p[x, y, z, rx, ry, rz] (meters and radians)
         if pose_str.startswith('PosX('):
-            # Extract coordinates
-            import re
-            match = re.search(r'PosX\((.*?)\)', pose_str)
-            if match:
-                coords_str = match.group(1)
-                coords = [float(c.strip()) for c in coords_str.split(',')]
-                # Convert mm to m for position
-                coords[0] /= 1000.0
-                coords[1] /= 1000.0
-                coords[2] /= 1000.0
-                # Convert degrees to radians for rotation
-                import math
-                coords[3] = math.radians(coords[3])
-                coords[4] = math.radians(coords[4])
-                coords[5] = math.radians(coords[5])
-                return f"p[{', '.join(f'{c:.6f}' for c in coords)}]"
+            # Extract coordinates (plain slicing, the format is fixed)
+            end = pose_str.find(')')
+            if end != -1:
+                coords = [float(c) for c in pose_str[5:end].split(',')]
+                if len(coords) == 6:
+                    x, y, z, rx, ry, rz = coords
+                    # Convert mm to m for position, degrees to radians for rotation
+                    return _POSX_FORMAT % (
+                        x * _MM_TO_M, y * _MM_TO_M, z * _MM_TO_M,
+                        rx * _DEG_TO_RAD, ry * _DEG_TO_RAD, rz * _DEG_TO_RAD
+                    )
+
+                # Other lengths: values after the sixth pass through unscaled
+                return "p[%s]" % ", ".join([
+                    "%.6f" % (c * (_MM_TO_M if i < 3 else _DEG_TO_RAD if i < 6 else 1.0))
+                    for i, c in enumerate(coords)
+                ])
 
         # PosJ -> joint positions (radians)
         elif pose_str.startswith('PosJ('):
-            import re
-            match = re.search(r'PosJ\((.*?)\)', pose_str)
-            if match:
-                coords_str = match.group(1)
-                coords = [float(c.strip()) for c in coords_str.split(',')]
+            end = pose_str.find(')')
+            if end != -1:
                 # Convert degrees to radians
-                import math
-                coords = [math.radians(c) for c in coords]
-                return f"[{', '.join(f'{c:.6f}' for c in coords)}]"
+                return "[%s]" % ", ".join([
+                    "%.6f" % (float(c) * _DEG_TO_RAD) for c in pose_str[5:end].split(',')
+                ])
 
         # Already in correct format
         if pose_str.startswith('p[') or pose_str.startswith('['):
@@ -170,23 +201,103 @@ class UniversalConverter:
 
         return pose_str
 
+    def _convert_poses_vectorized(self, program: TDLProgram) -> Dict[str, str]:
+        """
+        Convert all PosX/PosJ poses of program with NumPy in one pass.
+
+        Returns:
+            Mapping of pose string to UR Script pose; empty when NumPy is not
+            available or the program is too small to benefit
+        """
+        if np is None:
+            return {}
+
+        posx_coords: Dict[str, List[float]] = {}
+        posj_coords: Dict[str, List[float]] = {}
+
+        for goal in program.goals:
+            for args in goal.cmd_args:
+                for key in _POSE_KEYS:
+                    pose_str = args.get(key)
+                    if not isinstance(pose_str, str):
+                        continue
+                    if pose_str.startswith('PosX('):
+                        coords_by_pose = posx_coords
+                    elif pose_str.startswith('PosJ('):
+                        coords_by_pose = posj_coords
+                    else:
+                        continue
+                    if pose_str not in coords_by_pose and pose_str not in self._pose_cache:
+                        # Malformed poses are left to _extract_pose
+                        coords = self._parse_coords(pose_str)
+                        if coords is not None:
+                            coords_by_pose[pose_str] = coords
+
+        if len(posx_coords) + len(posj_coords) <= _VECTORIZE_MIN_POSES:
+            return {}
+
+        table = {}
+
+        if posx_coords:
+            # Convert mm to m for position, degrees to radians for rotation
+            coords = np.array(list(posx_coords.values()), dtype=np.float64)
+            np.multiply(coords[:, :3], _MM_TO_M, out=coords[:, :3])
+            np.multiply(coords[:, 3:], _DEG_TO_RAD, out=coords[:, 3:])
+            for pose_str, row in zip(posx_coords, coords.tolist()):
+                table[pose_str] = _POSX_FORMAT % tuple(row)
+
+        if posj_coords:
+            coords = np.array(list(posj_coords.values()), dtype=np.float64) * _DEG_TO_RAD
+            for pose_str, row in zip(posj_coords, coords.tolist()):
+                table[pose_str] = _POSJ_FORMAT % tuple(row)
+
+        return table
+
+    @staticmethod
+    def _parse_coords(pose_str: str) -> Optional[List[float]]:
+        """Parse the six coordinates of a PosX/PosJ string, or None."""
+        end = pose_str.find(')')
+        if end == -1:
+            return None
+        try:
+            coords = [float(c) for c in pose_str[5:end].split(',')]
+        except ValueError:
+            return None
+        return coords if len(coords) == 6 else None
+
+    # Command type -> converter method
+    _HANDLERS = {
+        "MoveLinear": _convert_move_linear,
+        "MoveJoint": _convert_move_joint,
+        "MoveCircular": _convert_move_circular,
+        "SetDigitalOutput": _convert_set_digital_output,
+        "GetDigitalInput": _convert_get_digital_input,
+        "Delay": _convert_delay,
+        "ArcOn": _convert_arc_on,
+        "ArcOff": _convert_arc_off,
+        "End": _convert_end,
+    }
+
 
 class UniversalJobGenerator:
     """Generates complete Universal Robots job file."""
 
+    def __init__(self):
+        # Reused across calls so the converter's pose cache carries over
+        self._converter = UniversalConverter()
+
     def generate(self, program: TDLProgram) -> str:
         """Generate complete UR Script job file."""
-        converter = UniversalConverter()
-
-        lines = []
+        out = io.StringIO()
+        self.generate_to(program, out)
+        return out.getvalue()
 
+    def generate_to(self, program: TDLProgram, fp: TextIO):
+        """Generate complete UR Script job file, writing to a text stream."""
         # File header
-        lines.append("# Universal Robots UR Script")
-        lines.append("# Auto-generated from TDL")
-        lines.append("")
+        fp.write("# Universal Robots UR Script\n"
+                 "# Auto-generated from TDL\n"
+                 "\n")
 
         # Convert program
-        ur_script = converter.convert(program)
-        lines.append(ur_script)
-
-        return "\n".join(lines)
+        self._converter.convert_to(program, fp)
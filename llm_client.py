@@ -2,153 +2,81 @@
 LLM Client for Google Gemini API
 Handles all communication with the Gemini API for natural language understanding.
 """
+import asyncio
+import copy
+import hashlib
+import http.client
 import json
 import os
-from typing import Dict, Any, Optional
-import urllib.request
-import urllib.error
-
-
-class GeminiClient:
-    """Client for Google Gemini API."""
-
-    def __init__(self, api_key: Optional[str] = None):
-        """
-        Initialize Gemini client.
-
-        Args:
-            api_key: Google AI Studio API key. If None, reads from GEMINI_API_KEY env var.
-        """
-        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError(
-                "Gemini API key is required. "
-                "Set GEMINI_API_KEY environment variable or pass api_key parameter."
-            )
-
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta"
-        self.model = "gemini-2.5-flash"
-
-    def generate_content(
-        self,
-        prompt: str,
-        temperature: float = 0.7,
-        max_tokens: int = 2048
-    ) -> str:
-        """
-        Generate content using Gemini API.
-
-        Args:
-            prompt: The prompt to send to the model
-            temperature: Sampling temperature (0.0 to 1.0)
-            max_tokens: Maximum tokens to generate
-
-        Returns:
-            Generated text response
-
-        Raises:
-            Exception: If API call fails
-        """
-        url = f"{self.base_url}/models/{self.model}:generateContent?key={self.api_key}"
-
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }],
-            "generationConfig": {
-                "temperature": temperature,
-                "maxOutputTokens": max_tokens,
-            }
-        }
-
-        headers = {
-            "Content-Type": "application/json"
-        }
-
-        try:
-            req = urllib.request.Request(
-                url,
-                data=json.dumps(payload).encode('utf-8'),
-                headers=headers,
-                method='POST'
-            )
-
-            with urllib.request.urlopen(req) as response:
-                response_data = json.loads(response.read().decode('utf-8'))
-
-            # Debug: Print response structure for troubleshooting
-            # print(f"DEBUG: Response keys: {response_data.keys()}")
-
-            # Extract text from response
-            if "candidates" in response_data and len(response_data["candidates"]) > 0:
-                candidate = response_data["candidates"][0]
-
-                # Check finish reason
-                finish_reason = candidate.get("finishReason", "")
-                if finish_reason == "MAX_TOKENS":
-                    # Response was cut off, but we can still try to get partial content
-                    pass
-
-                if "content" in candidate:
-                    content = candidate["content"]
-                    if "parts" in content and len(content["parts"]) > 0:
-                        parts = content["parts"]
-                        if "text" in parts[0]:
-                            return parts[0]["text"]
-
-                    # Handle case where content exists but parts is empty or missing
-                    # This can happen with MAX_TOKENS on very short responses
-                    if finish_reason == "MAX_TOKENS" and "parts" not in content:
-                        # Return empty string for test connection
-                        return ""
-
-            # If normal path fails, check for error messages in response
-            if "error" in response_data:
-                error_msg = response_data["error"].get("message", "Unknown error")
-                raise Exception(f"API returned error: {error_msg}")
-
-            # Last resort: return full response for debugging
-            raise Exception(f"Unexpected response format. Response: {json.dumps(response_data, indent=2)}")
-
-        except urllib.error.HTTPError as e:
-            error_body = e.read().decode('utf-8')
-            try:
-                error_json = json.loads(error_body)
-                if "error" in error_json:
-                    error_msg = error_json["error"].get("message", error_body)
-                    raise Exception(f"HTTP {e.code}: {error_msg}")
-            except json.JSONDecodeError:
-                pass
-            raise Exception(f"Gemini API HTTP error {e.code}: {error_body}")
-        except urllib.error.URLError as e:
-            raise Exception(f"Gemini API connection error: {e.reason}")
-        except Exception as e:
-            if "Gemini API" in str(e) or "HTTP" in str(e) or "API returned error" in str(e):
-                raise
-            raise Exception(f"Gemini API error: {str(e)}")
-
-    def analyze_requirement(self, user_input: str) -> Dict[str, Any]:
-        """
-        Analyze user requirement and extract structured information.
-
-        Args:
-            user_input: Natural language requirement
-
-        Returns:
-            Dictionary with actions, objects, locations, constraints
-        """
-        prompt = f"""당신은 로봇 작업 분석 전문가입니다. 사용자의 자연어 요구사항을 분석하여 구조화된 정보를 추출해주세요.
-
-사용자 입력: "{user_input}"
-
-다음 정보를 JSON 형식으로 추출해주세요:
-
-1. actions: 수행할 동작 리스트 (예: pick, place, move, transfer, wait, weld, assemble 등)
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard json module is used instead
+    orjson = None
+
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Contents of the first Markdown code fence (closing fence optional, in
+# case the response was cut off)
+_FENCE_RE = re.compile(r'```[^\n]*\n(.*?)(?:```|\Z)', re.DOTALL)
+_JSON_DECODER = json.JSONDecoder()
+
+# Codec for API request and response bodies (bytes in, bytes out)
+if orjson is not None:
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+else:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+    _loads = json.loads
+
+# Gemini Batch API: max size of one inline batch request, and the cap on
+# the exponential backoff between job status polls
+_BATCH_INLINE_LIMIT = 20 * 1024 * 1024
+_BATCH_MAX_POLL_INTERVAL = 120.0
+
+# Keep-alive HTTPS connections shared by all GeminiClient instances, so the
+# TCP/TLS handshake is paid once per process instead of once per request.
+# http.client connections are not thread-safe, hence one pool per thread.
+_CONNECTIONS = threading.local()
+
+# Timeouts (seconds); TDL generation with 8000 output tokens can take
+# well over a minute, so the read timeout is generous
+_CONNECT_TIMEOUT = 10.0
+_READ_TIMEOUT = 120.0
+
+# Transient failures are retried with exponential backoff. A read timeout
+# is not: the request was delivered and the server may still be generating
+# (and billing) it, so sending it again could only add another generation.
+_MAX_RETRIES = 3
+_RETRY_BACKOFF = 0.5
+_RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+class _ResponseTimeout(Exception):
+    """The request was sent but no response arrived within _READ_TIMEOUT."""
+
+# generate_content response cache: entries kept in memory per client, and
+# the on-disk cache directory shared by all runs
+_MEMORY_CACHE_SIZE = 512
+_DEFAULT_CACHE_DIR = "~/.cache/nltdl/gemini"
+
+# Prompt sections shared by the single-step and combined prompts
+_ANALYSIS_FIELDS = """1. actions: 수행할 동작 리스트 (예: pick, place, move, transfer, wait, weld, assemble 등)
 2. objects: 대상 물체 리스트 (예: box, part, component 등)
 3. locations: 위치 정보 리스트 (예: A, B, home, start 등)
-4. coordinates: 위치별 좌표 딕셔너리 (예: {{"A": [0, 0, 0, 0, 0, 0], "B": [100, 200, 50, 0, 0, 0]}})
+4. coordinates: 위치별 좌표 딕셔너리 (예: {"A": [0, 0, 0, 0, 0, 0], "B": [100, 200, 50, 0, 0, 0]})
 5. constraints: 제약 조건 리스트 (예: slow, fast, careful, precise 등)
 6. task_description: 작업에 대한 간단한 설명 (1-2 문장)
 
@@ -160,89 +88,63 @@ class GeminiClient:
 - 영어와 한국어 모두 지원
 - 사용자가 좌표를 명시한 경우 (예: A(0,0,0,0,0,0)), 반드시 정확히 추출하세요
 - 좌표 형식: [x, y, z, rx, ry, rz] (단위: mm, degrees)
-- 좌표가 명시되지 않은 경우 coordinates는 빈 딕셔너리로 설정
+- 좌표가 명시되지 않은 경우 coordinates는 빈 딕셔너리로 설정"""
 
-응답은 반드시 유효한 JSON 형식으로만 제공하세요. 다른 설명은 포함하지 마세요.
-
-JSON 형식:
-{{
+_ANALYSIS_JSON_FORMAT = """{
   "actions": ["action1", "action2"],
   "objects": ["object1"],
   "locations": ["location1", "location2"],
-  "coordinates": {{"location1": [x, y, z, rx, ry, rz], "location2": [x, y, z, rx, ry, rz]}},
+  "coordinates": {"location1": [x, y, z, rx, ry, rz], "location2": [x, y, z, rx, ry, rz]},
   "constraints": ["constraint1"],
   "task_description": "작업 설명"
-}}"""
-
-        response = self.generate_content(prompt, temperature=0.3)
-
-        # Extract JSON from response
-        try:
-            # Try to find JSON in response
-            response = response.strip()
-            if "```json" in response:
-                # Extract from code block
-                start = response.find("```json") + 7
-                end = response.find("```", start)
-                json_str = response[start:end].strip()
-            elif "```" in response:
-                # Extract from code block without language
-                start = response.find("```") + 3
-                end = response.find("```", start)
-                json_str = response[start:end].strip()
-            else:
-                json_str = response
-
-            result = json.loads(json_str)
-            return result
-        except json.JSONDecodeError as e:
-            raise Exception(f"Failed to parse LLM response as JSON: {e}\nResponse: {response}")
-
-    def generate_tdl(
-        self,
-        task_description: str,
-        actions: list,
-        objects: list,
-        locations: list,
-        constraints: list,
-        coordinates: dict = None
-    ) -> str:
-        """
-        Generate TDL document using LLM.
-
-        Args:
-            task_description: Task description
-            actions: List of actions
-            objects: List of objects
-            locations: List of locations
-            constraints: List of constraints
-            coordinates: Dictionary mapping locations to coordinates (optional)
-
-        Returns:
-            Complete TDL document as string
-        """
-        # Format coordinates if provided
-        coordinates_str = ""
-        if coordinates and isinstance(coordinates, dict) and len(coordinates) > 0:
-            coordinates_str = "\n사용자 지정 좌표:\n"
-            for loc, coords in coordinates.items():
-                if isinstance(coords, list) and len(coords) == 6:
-                    coordinates_str += f"   - {loc}: PosX({coords[0]}, {coords[1]}, {coords[2]}, {coords[3]}, {coords[4]}, {coords[5]})\n"
-
-        # Format objects with weights
-        objects_str = ', '.join(objects) if objects else '없음'
-
-        prompt = f"""당신은 TDL(Task Description Language) 문서 생성 전문가입니다.
-
-다음 정보를 바탕으로 완전한 TDL 문서를 생성해주세요:
-
-작업 설명: {task_description}
-동작: {', '.join(actions) if actions else '없음'}
-대상 물체: {objects_str}
-위치: {', '.join(locations) if locations else '없음'}
-제약 조건: {', '.join(constraints) if constraints else '없음'}{coordinates_str}
-
-TDL 문서 작성 규칙:
+}"""
+
+# Response schema for analyze_requirement (structured output). Gemini
+# schemas cannot describe objects with arbitrary keys, so coordinates come
+# back as a list of {location, pose} and are turned into a dict afterwards.
+_STRING_LIST_SCHEMA = {"type": "ARRAY", "items": {"type": "STRING"}}
+_ANALYSIS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "actions": _STRING_LIST_SCHEMA,
+        "objects": _STRING_LIST_SCHEMA,
+        "locations": _STRING_LIST_SCHEMA,
+        "coordinates": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "location": {"type": "STRING"},
+                    "pose": {"type": "ARRAY", "items": {"type": "NUMBER"}},
+                },
+                "required": ["location", "pose"],
+            },
+        },
+        "constraints": _STRING_LIST_SCHEMA,
+        "task_description": {"type": "STRING"},
+    },
+    "required": ["actions", "objects", "locations", "coordinates", "constraints", "task_description"],
+}
+
+# Response schemas for analyze_generate_explain
+_COMBINED_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "analysis": _ANALYSIS_SCHEMA,
+        "tdl": {"type": "STRING"},
+    },
+    "required": ["analysis", "tdl"],
+}
+_COMBINED_EXPLAIN_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        **_COMBINED_SCHEMA["properties"],
+        "explanation": {"type": "STRING"},
+    },
+    "required": ["analysis", "tdl", "explanation"],
+}
+
+_TDL_RULES = """TDL 문서 작성 규칙:
 
 1. HEADER 섹션 (필수):
 ```
@@ -270,20 +172,20 @@ END_HEADER
 2. 기본 구조 (GOAL 형식):
 ```
 GOAL Initialize_Process()
-{{
+{
     SPAWN command1() WITH WAIT;
     SPAWN command2() WITH WAIT;
-}}
+}
 
 GOAL Execute_Process()
-{{
+{
     SPAWN command3() WITH WAIT;
-}}
+}
 
 GOAL Finalize_Process()
-{{
+{
     SPAWN command4() WITH WAIT;
-}}
+}
 ```
 
 3. 핵심 명령어 (표준 TDL 명세):
@@ -335,7 +237,7 @@ GOAL Finalize_Process()
 5. Transfer 동작 시퀀스 (pick-and-place):
 ```
 GOAL Execute_Process()
-{{
+{
     // 1. Approach source (safe height: +100mm)
     SPAWN MoveLinear(target_pose=PosX(0, 0, 150, 0, 0, 0), velocity=100, acceleration=50, tool=0, blending_radius=0) WITH WAIT;
 
@@ -361,7 +263,7 @@ GOAL Execute_Process()
 
     // 8. Retract to safe height
     SPAWN MoveLinear(target_pose=PosX(300, 200, 150, 0, 0, 0), velocity=50, acceleration=50, tool=0, blending_radius=0) WITH WAIT;
-}}
+}
 ```
 
 6. 속도/가속도 설정:
@@ -374,44 +276,1171 @@ GOAL Execute_Process()
 7. Initialize_Process 예시:
 ```
 GOAL Initialize_Process()
-{{
+{
     SPAWN MoveJoint(target_pose=PosJ(0, 0, 90, 0, 90, 0), velocity=50, acceleration=50, tool=0, blending_radius=0) WITH WAIT;
     SPAWN SetDigitalOutput(port=1, value=0) WITH WAIT;  // Open gripper
-}}
+}
 ```
 
 8. Finalize_Process 예시:
 ```
 GOAL Finalize_Process()
-{{
+{
     SPAWN SetDigitalOutput(port=1, value=0) WITH WAIT;  // Ensure gripper open
     SPAWN MoveJoint(target_pose=PosJ(0, 0, 90, 0, 90, 0), velocity=50, acceleration=50, tool=0, blending_radius=0) WITH WAIT;
     SPAWN End() WITH WAIT;
-}}
+}
 ```
 
 9. 중요 규칙:
    - 모든 명령은 SPAWN ... WITH WAIT; 또는 SPAWN ...; 형식
    - WITH WAIT는 완료를 기다림, 없으면 비동기
-   - 각 GOAL은 {{}} 중괄호로 감쌈
+   - 각 GOAL은 {} 중괄호로 감쌈
    - 주석은 //로 시작
-   - 위치는 반드시 PosX() 또는 PosJ() 함수 사용
+   - 위치는 반드시 PosX() 또는 PosJ() 함수 사용"""
+
+# generate_tdl prompt, minus the task block in between
+_TDL_PROMPT_HEAD = """당신은 TDL(Task Description Language) 문서 생성 전문가입니다.
+
+다음 정보를 바탕으로 완전한 TDL 문서를 생성해주세요:
+
+"""
+
+_TDL_PROMPT_TAIL = f"""
+
+{_TDL_RULES}
 
 완전하고 실행 가능한 TDL 문서를 생성하세요. 표준 TDL 명세를 정확히 따르세요. 다른 설명 없이 TDL 문서만 출력하세요."""
 
-        response = self.generate_content(prompt, temperature=0.5, max_tokens=8000)
+# Static TDL instructions stored once as Gemini cached content, so that
+# generate_tdl(context_cache=True) only sends the task block per request
+_TDL_CACHED_INSTRUCTION = (
+    _TDL_PROMPT_HEAD + "(작업 정보는 다음 메시지로 제공됩니다)" + _TDL_PROMPT_TAIL
+)
+_CONTEXT_CACHE_TTL = 3600
 
-        # Clean response
-        response = response.strip()
-        if "```" in response:
-            # Extract from code block
-            start = response.find("```")
-            # Skip the first ``` line
-            start = response.find("\n", start) + 1
-            end = response.find("```", start)
-            response = response[start:end].strip()
+# Explanation section of the combined prompt (same content as explain_tdl)
+_EXPLAIN_INSTRUCTIONS = """3단계 - TDL 문서 설명. 2단계에서 생성한 TDL 문서를 일반인이 이해할 수 있도록 한국어로 설명해주세요.
+
+설명에 포함할 내용:
+1. 전체 작업의 목적
+2. 주요 단계별 설명
+3. 각 GOAL의 역할
+4. 중요한 명령어들의 의미
+
+간결하고 명확하게 설명해주세요."""
+
+_EMPTY_FIELD = "없음"
+
+
+def _get_connection(host: str) -> http.client.HTTPSConnection:
+    """Get this thread's persistent connection to host."""
+    pool = getattr(_CONNECTIONS, "pool", None)
+    if pool is None:
+        pool = _CONNECTIONS.pool = {}
+
+    conn = pool.get(host)
+    if conn is None:
+        conn = pool[host] = http.client.HTTPSConnection(host, timeout=_CONNECT_TIMEOUT)
+    return conn
+
+
+class _RateLimiter:
+    """Spaces out asyncio tasks to stay under a requests-per-minute quota."""
+
+    def __init__(self, per_minute: float):
+        self._interval = 60.0 / per_minute
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        """Wait for the next free request slot."""
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class GeminiClient:
+    """Client for Google Gemini API."""
+
+    def __init__(self, api_key: Optional[str] = None, response_cache: bool = True):
+        """
+        Initialize Gemini client.
+
+        Args:
+            api_key: Google AI Studio API key. If None, reads from GEMINI_API_KEY env var.
+            response_cache: Allow generate_content to reuse cached responses.
+                If False, every request goes to the API.
+        """
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
+            raise ValueError(
+                "Gemini API key is required. "
+                "Set GEMINI_API_KEY environment variable or pass api_key parameter."
+            )
+
+        self.base_url = "https://generativelanguage.googleapis.com/v1beta"
+        self.model = "gemini-2.5-flash"
+
+        base = urlsplit(self.base_url)
+        self._host = base.netloc
+        self._base_path = base.path
+
+        # Exact-match cache of analyze_requirement results
+        self._exact_cache: Dict[bytes, Dict[str, Any]] = {}
+
+        # Name and expiry of the cached TDL instructions (context caching)
+        self._cache_name: Optional[str] = None
+        self._cache_expires = 0.0
+
+        # Two-tier cache of generate_content responses (memory LRU + disk)
+        self.response_cache = response_cache
+        self._mem_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._mem_cache_lock = threading.Lock()
+        self.cache_dir = Path(os.getenv("NLTDL_CACHE_DIR", _DEFAULT_CACHE_DIR)).expanduser()
+
+    def generate_content(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        cache: bool = True,
+        cached_content: Optional[str] = None,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Generate content using Gemini API.
+
+        Responses are cached by model, prompt and generation settings, in
+        memory and on disk (NLTDL_CACHE_DIR, default ~/.cache/nltdl/gemini).
+        Only complete responses (finish reason STOP, and valid JSON when a
+        response schema is given) are cached.
+
+        Args:
+            prompt: The prompt to send to the model
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate
+            cache: Look up and store the response in the cache (ignored
+                when the client was created with response_cache=False)
+            cached_content: Name of Gemini cached content to prepend to prompt
+            response_schema: Schema the response must follow; the response is
+                then JSON text
+
+        Returns:
+            Generated text response
+
+        Raises:
+            Exception: If API call fails
+        """
+        key = None
+        if cache and self.response_cache:
+            key_text = f"{self.model}|{temperature}|{max_tokens}|{prompt}"
+            if cached_content:
+                key_text = f"{cached_content}|{key_text}"
+            if response_schema:
+                key_text = f"{json.dumps(response_schema, sort_keys=True)}|{key_text}"
+            key = hashlib.sha256(key_text.encode('utf-8')).hexdigest()
+            cached = self._get_cached_response(key)
+            if cached is not None:
+                return cached
+
+        path = f"{self._base_path}/models/{self.model}:generateContent?key={self.api_key}"
+        payload = self._generation_payload(prompt, temperature, max_tokens, response_schema)
+        if cached_content:
+            payload["cachedContent"] = cached_content
+
+        try:
+            response_data = self._call_json('POST', path, payload)
+
+            # Debug: Print response structure for troubleshooting
+            # print(f"DEBUG: Response keys: {response_data.keys()}")
+
+            text = self._extract_text(response_data)
+
+        except Exception as e:
+            if "Gemini API" in str(e) or "HTTP" in str(e) or "API returned error" in str(e):
+                raise
+            raise Exception(f"Gemini API error: {str(e)}")
+
+        if key is not None and self._is_complete(response_data, text, response_schema):
+            self._put_cached_response(key, text)
+        return text
+
+    @staticmethod
+    def _is_complete(
+        response_data: Dict[str, Any],
+        text: str,
+        response_schema: Optional[Dict[str, Any]]
+    ) -> bool:
+        """
+        Check whether a generateContent response may be cached.
+
+        A truncated (MAX_TOKENS) or blocked response, or structured output
+        that is not valid JSON, would otherwise be returned on every later
+        run instead of a new generation.
+        """
+        candidates = response_data.get("candidates") or [{}]
+        if candidates[0].get("finishReason") != "STOP":
+            return False
+
+        if response_schema is not None:
+            try:
+                json.loads(text)
+            except json.JSONDecodeError:
+                return False
+
+        return True
+
+    def generate_structured(
+        self,
+        prompt: str,
+        schema: Dict[str, Any],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Generate JSON content that follows a response schema.
+
+        Args:
+            prompt: The prompt to send to the model
+            schema: Gemini response schema (OpenAPI subset)
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate
+            cache: Look up and store the response in the cache
+
+        Returns:
+            Decoded JSON response
+
+        Raises:
+            Exception: If API call fails or the response is not valid JSON
+        """
+        response = self.generate_content(
+            prompt, temperature=temperature, max_tokens=max_tokens,
+            cache=cache, response_schema=schema
+        )
+        try:
+            return json.loads(response)
+        except json.JSONDecodeError as e:
+            raise Exception(f"Failed to parse LLM response as JSON: {e}\nResponse: {response}")
+
+    def _get_cached_response(self, key: str) -> Optional[str]:
+        """Look up cached response in memory, then on disk."""
+        with self._mem_cache_lock:
+            text = self._mem_cache.get(key)
+            if text is not None:
+                self._mem_cache.move_to_end(key)
+                return text
+
+        try:
+            text = (self.cache_dir / key[:2] / key).read_text(encoding='utf-8')
+        except OSError:
+            return None
+
+        self._remember_response(key, text)
+        return text
+
+    def _put_cached_response(self, key: str, text: str):
+        """Store response in memory and on disk."""
+        self._remember_response(key, text)
+
+        # The disk cache is best effort; an unwritable directory only
+        # disables it
+        path = self.cache_dir / key[:2] / key
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(text, encoding='utf-8')
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def _remember_response(self, key: str, text: str):
+        """Add response to the in-memory LRU cache."""
+        with self._mem_cache_lock:
+            self._mem_cache[key] = text
+            self._mem_cache.move_to_end(key)
+            if len(self._mem_cache) > _MEMORY_CACHE_SIZE:
+                self._mem_cache.popitem(last=False)
+
+    def stream_generate_content(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2048
+    ) -> Iterator[str]:
+        """
+        Generate content using Gemini API, yielding text as it is generated.
+
+        Uses the streamGenerateContent endpoint with server-sent events, so
+        the first chunk arrives long before the full response is done.
+
+        Args:
+            prompt: The prompt to send to the model
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate
+
+        Yields:
+            Generated text chunks
+
+        Raises:
+            Exception: If API call fails
+        """
+        path = f"{self._base_path}/models/{self.model}:streamGenerateContent?alt=sse&key={self.api_key}"
+        body = _dumps(self._generation_payload(prompt, temperature, max_tokens))
+        headers = {
+            "Content-Type": "application/json"
+        }
+
+        # A stream holds its connection until it is consumed, so it gets a
+        # dedicated one instead of blocking the shared keep-alive connection
+        conn = http.client.HTTPSConnection(self._host, timeout=_CONNECT_TIMEOUT)
+        try:
+            try:
+                conn.connect()
+                conn.sock.settimeout(_READ_TIMEOUT)
+                conn.request('POST', path, body=body, headers=headers)
+                response = conn.getresponse()
+            except (http.client.HTTPException, OSError) as e:
+                raise Exception(f"Gemini API connection error: {e}")
+
+            if response.status >= 400:
+                self._raise_for_status(response.status, response.read())
+
+            for line in response:
+                if not line.startswith(b"data:"):
+                    continue
+
+                chunk = _loads(line[5:])
+                if "error" in chunk:
+                    error_msg = chunk["error"].get("message", "Unknown error")
+                    raise Exception(f"API returned error: {error_msg}")
+
+                for candidate in chunk.get("candidates", [])[:1]:
+                    for part in candidate.get("content", {}).get("parts", []):
+                        if part.get("text"):
+                            yield part["text"]
+        finally:
+            conn.close()
+
+    def batch_generate_content(
+        self,
+        prompts: List[str],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        poll_interval: float = 10.0,
+        timeout: Optional[float] = None
+    ) -> List[str]:
+        """
+        Generate content for many prompts using the Gemini Batch API.
+
+        Batch jobs are billed at a discount but run asynchronously (minutes
+        to hours), so this is meant for non-interactive workloads. Prompts
+        are sent as inline requests, split over several jobs when they
+        exceed the inline request size limit.
+
+        Args:
+            prompts: Prompts to send to the model
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate per prompt
+            poll_interval: Initial delay between job status checks (seconds)
+            timeout: Maximum time to wait for each job (seconds, None = no limit)
+
+        Returns:
+            Generated text responses, in the same order as prompts
+
+        Raises:
+            Exception: If a batch job or any of its requests fails
+        """
+        # Submit all jobs first so they are processed concurrently
+        jobs = [
+            (self._create_batch(requests), len(requests))
+            for requests in self._split_batch(prompts, temperature, max_tokens)
+        ]
+
+        results = []
+        for name, count in jobs:
+            results.extend(self._wait_batch(name, count, poll_interval, timeout))
+        return results
+
+    def _split_batch(
+        self,
+        prompts: List[str],
+        temperature: float,
+        max_tokens: int
+    ) -> List[List[Dict[str, Any]]]:
+        """Build inline batch requests, grouped to stay under the size limit."""
+        groups = []
+        current = []
+        current_size = 0
+
+        for prompt in prompts:
+            request = {
+                "request": self._generation_payload(prompt, temperature, max_tokens),
+                "metadata": {"key": str(len(current))}
+            }
+            size = len(_dumps(request))
+
+            if current and current_size + size > _BATCH_INLINE_LIMIT:
+                groups.append(current)
+                current = []
+                current_size = 0
+                request["metadata"]["key"] = "0"
+
+            current.append(request)
+            current_size += size
+
+        if current:
+            groups.append(current)
+        return groups
+
+    def _create_batch(self, requests: List[Dict[str, Any]]) -> str:
+        """Create batch job from inline requests and return its name."""
+        path = f"{self._base_path}/models/{self.model}:batchGenerateContent?key={self.api_key}"
+        payload = {
+            "batch": {
+                "display_name": f"nltdl-{len(requests)}-requests",
+                "input_config": {
+                    "requests": {"requests": requests}
+                }
+            }
+        }
+        return self._call_json('POST', path, payload)["name"]
+
+    def _wait_batch(
+        self,
+        name: str,
+        count: int,
+        poll_interval: float,
+        timeout: Optional[float]
+    ) -> List[str]:
+        """Poll batch job until it finishes and return its responses in order."""
+        path = f"{self._base_path}/{name}?key={self.api_key}"
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = poll_interval
+
+        while True:
+            operation = self._call_json('GET', path)
+            state = operation.get("metadata", {}).get("state", "")
+            if operation.get("done") or state.endswith(("SUCCEEDED", "FAILED", "CANCELLED", "EXPIRED")):
+                break
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise Exception(f"Gemini batch {name} did not finish in {timeout}s (state: {state})")
+            time.sleep(delay)
+            delay = min(delay * 2, _BATCH_MAX_POLL_INTERVAL)
+
+        if "error" in operation:
+            error_msg = operation["error"].get("message", "Unknown error")
+            raise Exception(f"Gemini batch {name} failed: {error_msg}")
+        if state and not state.endswith("SUCCEEDED"):
+            raise Exception(f"Gemini batch {name} finished with state {state}")
+
+        output = operation.get("response", {})
+        output = output.get("output", output)
+        responses = output.get("inlinedResponses", [])
+        if isinstance(responses, dict):
+            responses = responses.get("inlinedResponses", [])
+
+        results = [None] * count
+        for position, item in enumerate(responses):
+            index = int(item.get("metadata", {}).get("key", position))
+            if "error" in item:
+                error_msg = item["error"].get("message", "Unknown error")
+                raise Exception(f"Gemini batch request {index} failed: {error_msg}")
+            results[index] = self._extract_text(item.get("response", {}))
+
+        if None in results:
+            raise Exception(f"Gemini batch {name} returned {len(responses)} of {count} responses")
+        return results
+
+    def _generation_payload(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Build generateContent request body."""
+        payload = {
+            "contents": [{
+                "parts": [{
+                    "text": prompt
+                }]
+            }],
+            "generationConfig": {
+                "temperature": temperature,
+                "maxOutputTokens": max_tokens,
+            }
+        }
+
+        if response_schema:
+            # Constrained decoding: the response is JSON matching the schema
+            payload["generationConfig"]["responseMimeType"] = "application/json"
+            payload["generationConfig"]["responseSchema"] = response_schema
+
+        return payload
+
+    def _extract_text(self, response_data: Dict[str, Any]) -> str:
+        """
+        Extract generated text from generateContent response.
+
+        Raises:
+            Exception: If the response has no text
+        """
+        # Extract text from response
+        if "candidates" in response_data and len(response_data["candidates"]) > 0:
+            candidate = response_data["candidates"][0]
+
+            # Check finish reason
+            finish_reason = candidate.get("finishReason", "")
+            if finish_reason == "MAX_TOKENS":
+                # Response was cut off, but we can still try to get partial content
+                pass
+
+            if "content" in candidate:
+                content = candidate["content"]
+                if "parts" in content and len(content["parts"]) > 0:
+                    parts = content["parts"]
+                    if "text" in parts[0]:
+                        return parts[0]["text"]
+
+                # Handle case where content exists but parts is empty or missing
+                # This can happen with MAX_TOKENS on very short responses
+                if finish_reason == "MAX_TOKENS" and "parts" not in content:
+                    # Return empty string for test connection
+                    return ""
+
+        # If normal path fails, check for error messages in response
+        if "error" in response_data:
+            error_msg = response_data["error"].get("message", "Unknown error")
+            raise Exception(f"API returned error: {error_msg}")
+
+        # Last resort: return full response for debugging
+        raise Exception(f"Unexpected response format. Response: {json.dumps(response_data, indent=2)}")
+
+    def _call_json(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Send JSON request to the Gemini API and decode the JSON response.
+
+        Raises:
+            Exception: On connection failure or HTTP error status
+        """
+        body = None if payload is None else _dumps(payload)
+        headers = {
+            "Content-Type": "application/json"
+        }
+
+        try:
+            status, response_body = self._request(method, path, body, headers)
+        except (http.client.HTTPException, OSError) as e:
+            raise Exception(f"Gemini API connection error: {e}")
+
+        self._raise_for_status(status, response_body)
+        return _loads(response_body)
+
+    def _raise_for_status(self, status: int, response_body: bytes):
+        """Raise exception with the API error message for HTTP error status."""
+        if status < 400:
+            return
+
+        error_body = response_body.decode('utf-8')
+        try:
+            error_json = json.loads(error_body)
+            if "error" in error_json:
+                error_msg = error_json["error"].get("message", error_body)
+                raise Exception(f"HTTP {status}: {error_msg}")
+        except json.JSONDecodeError:
+            pass
+        raise Exception(f"Gemini API HTTP error {status}: {error_body}")
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, bytes]:
+        """
+        Send request over the shared keep-alive connection.
+
+        Connection errors and 429/5xx responses are retried with exponential
+        backoff. A read timeout after the request was sent is not retried.
+
+        Args:
+            method: HTTP method
+            path: Request path including query string
+            body: Request body
+            headers: Request headers
+
+        Returns:
+            Tuple of (HTTP status, response body)
+
+        Raises:
+            _ResponseTimeout: If the server did not respond in time
+        """
+        for attempt in range(_MAX_RETRIES + 1):
+            try:
+                status, response_body = self._send(method, path, body, headers or {})
+            except (http.client.HTTPException, OSError):
+                if attempt == _MAX_RETRIES:
+                    raise
+            else:
+                if status not in _RETRY_STATUSES or attempt == _MAX_RETRIES:
+                    return status, response_body
+
+            time.sleep(_RETRY_BACKOFF * 2 ** attempt)
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Dict[str, str]
+    ) -> Tuple[int, bytes]:
+        """Send single request, reconnecting once if the connection went stale."""
+        conn = _get_connection(self._host)
+        try:
+            return self._send_on(conn, method, path, body, headers)
+        except (http.client.HTTPException, ConnectionError):
+            # The server may have dropped the idle connection; reconnect once
+            conn.close()
+            try:
+                return self._send_on(conn, method, path, body, headers)
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                raise
+        except OSError:
+            conn.close()
+            raise
+
+    def _send_on(
+        self,
+        conn: http.client.HTTPSConnection,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Dict[str, str]
+    ) -> Tuple[int, bytes]:
+        """Send request on connection with connect and read timeouts."""
+        if conn.sock is None:
+            conn.connect()
+            conn.sock.settimeout(_READ_TIMEOUT)
+
+        conn.request(method, path, body=body, headers=headers)
+        try:
+            response = conn.getresponse()
+            return response.status, response.read()
+        except socket.timeout as e:
+            conn.close()
+            raise _ResponseTimeout(
+                f"Gemini API did not respond within {_READ_TIMEOUT:.0f}s"
+            ) from e
+
+    def analyze_requirement(self, user_input: str) -> Dict[str, Any]:
+        """
+        Analyze user requirement and extract structured information.
+
+        To also generate the TDL document, prefer analyze_and_generate,
+        which does both in a single request.
+
+        Args:
+            user_input: Natural language requirement
+
+        Returns:
+            Dictionary with actions, objects, locations, constraints
+        """
+        cached = self.get_cached_analysis(user_input)
+        if cached is not None:
+            return cached
+
+        prompt = self._analysis_prompt(user_input)
+        result = self.generate_structured(prompt, _ANALYSIS_SCHEMA, temperature=0.3)
+        self._coordinates_to_dict(result)
+
+        self._exact_cache[self._cache_key(user_input)] = copy.deepcopy(result)
+        return result
+
+    def _analysis_prompt(self, user_input: str) -> str:
+        """Build analyze_requirement prompt."""
+        return f"""당신은 로봇 작업 분석 전문가입니다. 사용자의 자연어 요구사항을 분석하여 구조화된 정보를 추출해주세요.
+
+사용자 입력: "{user_input}"
+
+다음 정보를 JSON 형식으로 추출해주세요:
+
+{_ANALYSIS_FIELDS}
+
+응답은 반드시 유효한 JSON 형식으로만 제공하세요. 다른 설명은 포함하지 마세요.
+
+JSON 형식:
+{_ANALYSIS_JSON_FORMAT}"""
+
+    def _parse_analysis(self, response: str) -> Dict[str, Any]:
+        """Parse analyze_requirement response JSON."""
+        # Decode the first JSON object in the response, whether or not it
+        # is wrapped in a code fence or surrounded by other text
+        response = response.strip()
+        try:
+            result, _ = _JSON_DECODER.raw_decode(response, max(response.find('{'), 0))
+        except json.JSONDecodeError as e:
+            raise Exception(f"Failed to parse LLM response as JSON: {e}\nResponse: {response}")
+
+        return result
+
+    def _coordinates_to_dict(self, result: Dict[str, Any]):
+        """Turn coordinates of a structured analysis into a location dict."""
+        result["coordinates"] = {
+            entry["location"]: entry["pose"]
+            for entry in result.get("coordinates", [])
+        }
+
+    def analyze_and_generate(self, user_input: str) -> Tuple[Dict[str, Any], str]:
+        """
+        Analyze user requirement and generate its TDL document in one request.
+
+        Saves the second round-trip of calling analyze_requirement and then
+        generate_tdl, and is the preferred way to run both steps.
+
+        Args:
+            user_input: Natural language requirement
+
+        Returns:
+            Tuple of (analysis dictionary, TDL document)
+        """
+        result = self.analyze_generate_explain(user_input, explain=False)
+        return result["analysis"], result["tdl"]
+
+    def analyze_generate_explain(
+        self,
+        user_input: str,
+        explain: bool = True,
+        cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Analyze requirement, generate its TDL document and explain it in one
+        structured request.
+
+        The static instructions come first in the prompt and the requirement
+        last, so that repeated calls share the same prompt prefix.
+
+        Args:
+            user_input: Natural language requirement
+            explain: Also return a human-readable explanation of the TDL
+            cache: Look up and store the response in the response cache
+
+        Returns:
+            Dictionary with analysis (dict), tdl (str) and, if explain is
+            set, explanation (str)
+        """
+        schema = _COMBINED_EXPLAIN_SCHEMA if explain else _COMBINED_SCHEMA
+        max_tokens = 14000 if explain else 10000
+        result = self.generate_structured(
+            self._combined_prompt(user_input, explain), schema,
+            temperature=0.4, max_tokens=max_tokens, cache=cache
+        )
+
+        analysis = result.get("analysis")
+        tdl = result.get("tdl")
+        if not isinstance(analysis, dict) or not isinstance(tdl, str):
+            raise Exception(f"LLM response is missing 'analysis' or 'tdl'\nResponse: {result}")
+
+        self._coordinates_to_dict(analysis)
+        self._exact_cache[self._cache_key(user_input)] = copy.deepcopy(analysis)
+
+        result["tdl"] = self._clean_tdl(tdl)
+        if explain:
+            result["explanation"] = result.get("explanation", "").strip()
+        return result
+
+    def _combined_prompt(self, user_input: str, explain: bool = False) -> str:
+        """Build analyze_generate_explain prompt."""
+        explain_section = f"\n\n{_EXPLAIN_INSTRUCTIONS}" if explain else ""
+        return f"""당신은 로봇 작업 분석 및 TDL(Task Description Language) 문서 생성 전문가입니다. 사용자의 자연어 요구사항을 분석하고, 분석 결과를 바탕으로 완전한 TDL 문서를 생성해주세요.
+
+1단계 - 요구사항 분석. 다음 정보를 추출해주세요:
+
+{_ANALYSIS_FIELDS}
+
+2단계 - TDL 문서 생성. 1단계의 분석 결과를 바탕으로 TDL 문서를 생성해주세요.
+사용자가 좌표를 명시한 경우, 그 좌표가 "사용자 지정 좌표"입니다.
+
+{_TDL_RULES}{explain_section}
+
+"tdl" 필드에는 완전하고 실행 가능한 TDL 문서 전체를 하나의 문자열로 넣으세요.
+
+사용자 입력: "{user_input}\""""
+
+    def get_cached_analysis(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up analyze_requirement result for an identical earlier input.
+
+        Inputs are compared after lowercasing and collapsing whitespace.
+
+        Args:
+            user_input: Natural language requirement
+
+        Returns:
+            Copy of cached result, or None on cache miss
+        """
+        cached = self._exact_cache.get(self._cache_key(user_input))
+        if cached is None:
+            return None
+        return copy.deepcopy(cached)
+
+    def _cache_key(self, user_input: str) -> bytes:
+        """Hash normalized requirement text."""
+        normalized = _WHITESPACE_RE.sub(' ', user_input.strip().lower())
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).digest()
+
+    async def aanalyze_requirement(self, user_input: str) -> Dict[str, Any]:
+        """
+        Asynchronous version of analyze_requirement.
+
+        The blocking HTTP call runs in the default executor so that several
+        requirements can be analyzed concurrently with asyncio.gather.
+
+        Args:
+            user_input: Natural language requirement
+
+        Returns:
+            Dictionary with actions, objects, locations, constraints
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.analyze_requirement, user_input)
+
+    async def aanalyze_generate_explain(
+        self,
+        user_input: str,
+        explain: bool = True,
+        cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Asynchronous version of analyze_generate_explain.
+
+        Args:
+            user_input: Natural language requirement
+            explain: Also return a human-readable explanation of the TDL
+            cache: Look up and store the response in the response cache
+
+        Returns:
+            Dictionary with analysis, tdl and (if explain is set) explanation
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self.analyze_generate_explain, user_input, explain, cache
+        )
+
+    async def agenerate_content(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2048
+    ) -> str:
+        """
+        Asynchronous version of generate_content.
+
+        Args:
+            prompt: The prompt to send to the model
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated text response
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self.generate_content, prompt, temperature, max_tokens
+        )
+
+    async def agenerate_many(
+        self,
+        prompts: List[str],
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        concurrency: int = 8,
+        qpm: float = 500
+    ) -> List[str]:
+        """
+        Generate content for independent prompts concurrently.
+
+        At most `concurrency` requests are in flight, and request starts are
+        spaced to stay under `qpm` requests per minute.
+
+        Args:
+            prompts: Prompts to send to the model
+            temperature: Sampling temperature (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate per prompt
+            concurrency: Maximum number of simultaneous requests
+            qpm: Maximum requests per minute
+
+        Returns:
+            Generated text responses, in the same order as prompts
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        limiter = _RateLimiter(qpm)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            async def run_one(prompt):
+                async with semaphore:
+                    await limiter.acquire()
+                    return await loop.run_in_executor(
+                        executor, self.generate_content, prompt, temperature, max_tokens
+                    )
+
+            return list(await asyncio.gather(*(run_one(p) for p in prompts)))
+
+    def generate_many(self, prompts: List[str], **options) -> List[str]:
+        """
+        Generate content for independent prompts concurrently.
+
+        Synchronous wrapper around agenerate_many; must not be called from a
+        running event loop.
+
+        Args:
+            prompts: Prompts to send to the model
+            **options: Options of agenerate_many
+
+        Returns:
+            Generated text responses, in the same order as prompts
+        """
+        return asyncio.run(self.agenerate_many(prompts, **options))
+
+    def analyze_requirements_batch(self, user_inputs: List[str], **batch_options) -> List[Dict[str, Any]]:
+        """
+        Analyze many requirements using the Gemini Batch API.
+
+        Requirements already in the cache are not resubmitted.
+
+        Args:
+            user_inputs: Natural language requirements
+            **batch_options: Extra options for batch_generate_content
+
+        Returns:
+            Analysis dictionaries, in the same order as user_inputs
+        """
+        results = [self.get_cached_analysis(user_input) for user_input in user_inputs]
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        if pending:
+            prompts = [self._analysis_prompt(user_inputs[i]) for i in pending]
+            responses = self.batch_generate_content(prompts, temperature=0.3, **batch_options)
+
+            for i, response in zip(pending, responses):
+                result = self._parse_analysis(response)
+                self._exact_cache[self._cache_key(user_inputs[i])] = copy.deepcopy(result)
+                results[i] = result
+
+        return results
+
+    def generate_tdl(
+        self,
+        task_description: str,
+        actions: list,
+        objects: list,
+        locations: list,
+        constraints: list,
+        coordinates: dict = None,
+        stream: bool = False,
+        on_token: Optional[Callable[[str], None]] = None,
+        context_cache: bool = False
+    ) -> str:
+        """
+        Generate TDL document using LLM.
+
+        When starting from a natural language requirement, prefer
+        analyze_and_generate, which saves the separate analysis request.
+
+        Args:
+            task_description: Task description
+            actions: List of actions
+            objects: List of objects
+            locations: List of locations
+            constraints: List of constraints
+            coordinates: Dictionary mapping locations to coordinates (optional)
+            stream: Receive the document incrementally via stream_generate_content
+            on_token: Called with each text chunk as it arrives (stream only)
+            context_cache: Keep the static instructions in Gemini cached content
+                and send only the task block (worthwhile for repeated calls
+                within an hour; ignored with stream)
+
+        Returns:
+            Complete TDL document as string
+        """
+        task_block = self._tdl_task_block(
+            task_description, actions, objects, locations, constraints, coordinates
+        )
+
+        if context_cache and not stream:
+            response = self._generate_with_cached_instructions(task_block)
+            if response is not None:
+                return self._clean_tdl(response)
+
+        if stream:
+            chunks = []
+            for chunk in self.stream_tdl(
+                task_description, actions, objects, locations, constraints, coordinates
+            ):
+                if on_token:
+                    on_token(chunk)
+                chunks.append(chunk)
+            response = "".join(chunks)
+        else:
+            prompt = _TDL_PROMPT_HEAD + task_block + _TDL_PROMPT_TAIL
+            response = self.generate_content(prompt, temperature=0.5, max_tokens=8000)
+
+        return self._clean_tdl(response)
+
+    def stream_tdl(
+        self,
+        task_description: str,
+        actions: list,
+        objects: list,
+        locations: list,
+        constraints: list,
+        coordinates: dict = None
+    ) -> Iterator[str]:
+        """
+        Generate TDL document using LLM, yielding raw text as it is generated.
+
+        The chunks are not cleaned; code fences may still be present.
+
+        Args:
+            task_description: Task description
+            actions: List of actions
+            objects: List of objects
+            locations: List of locations
+            constraints: List of constraints
+            coordinates: Dictionary mapping locations to coordinates (optional)
+
+        Yields:
+            Generated TDL text chunks
+        """
+        task_block = self._tdl_task_block(
+            task_description, actions, objects, locations, constraints, coordinates
+        )
+        prompt = _TDL_PROMPT_HEAD + task_block + _TDL_PROMPT_TAIL
+        yield from self.stream_generate_content(prompt, temperature=0.5, max_tokens=8000)
+
+    def generate_tdl_batch(self, tasks: List[Dict[str, Any]], **batch_options) -> List[str]:
+        """
+        Generate TDL documents for many tasks using the Gemini Batch API.
+
+        Args:
+            tasks: Keyword arguments of generate_tdl for each task
+            **batch_options: Extra options for batch_generate_content
+
+        Returns:
+            TDL documents, in the same order as tasks
+        """
+        prompts = [self._tdl_prompt(**task) for task in tasks]
+        responses = self.batch_generate_content(
+            prompts, temperature=0.5, max_tokens=8000, **batch_options
+        )
+        return [self._clean_tdl(response) for response in responses]
+
+    def _tdl_prompt(
+        self,
+        task_description: str,
+        actions: list,
+        objects: list,
+        locations: list,
+        constraints: list,
+        coordinates: dict = None
+    ) -> str:
+        """Build generate_tdl prompt."""
+        return _TDL_PROMPT_HEAD + self._tdl_task_block(
+            task_description, actions, objects, locations, constraints, coordinates
+        ) + _TDL_PROMPT_TAIL
+
+    def _tdl_task_block(
+        self,
+        task_description: str,
+        actions: list,
+        objects: list,
+        locations: list,
+        constraints: list,
+        coordinates: dict = None
+    ) -> str:
+        """Format the task-specific part of the generate_tdl prompt."""
+        # Format coordinates if provided
+        coordinates_str = ""
+        if coordinates and isinstance(coordinates, dict) and len(coordinates) > 0:
+            coordinates_str = "\n사용자 지정 좌표:\n"
+            for loc, coords in coordinates.items():
+                if isinstance(coords, list) and len(coords) == 6:
+                    coordinates_str += f"   - {loc}: PosX({coords[0]}, {coords[1]}, {coords[2]}, {coords[3]}, {coords[4]}, {coords[5]})\n"
+
+        return (
+            f"작업 설명: {task_description}\n"
+            f"동작: {', '.join(actions) if actions else _EMPTY_FIELD}\n"
+            f"대상 물체: {', '.join(objects) if objects else _EMPTY_FIELD}\n"
+            f"위치: {', '.join(locations) if locations else _EMPTY_FIELD}\n"
+            f"제약 조건: {', '.join(constraints) if constraints else _EMPTY_FIELD}{coordinates_str}"
+        )
+
+    def _generate_with_cached_instructions(self, task_block: str) -> Optional[str]:
+        """
+        Generate TDL using the cached static instructions.
+
+        Returns:
+            Generated text, or None if context caching is unavailable (e.g.
+            the model does not support it)
+        """
+        try:
+            name = self._ensure_cached_prefix()
+        except Exception:
+            return None
+
+        try:
+            return self.generate_content(
+                task_block, temperature=0.5, max_tokens=8000, cached_content=name
+            )
+        except Exception as e:
+            if "HTTP 404" not in str(e) and "HTTP 403" not in str(e):
+                raise
+
+        # Cached content expired or was deleted; recreate it once
+        self._cache_name = None
+        return self.generate_content(
+            task_block, temperature=0.5, max_tokens=8000,
+            cached_content=self._ensure_cached_prefix()
+        )
+
+    def _ensure_cached_prefix(self) -> str:
+        """Create Gemini cached content for the TDL instructions if needed."""
+        if self._cache_name is not None and time.monotonic() < self._cache_expires:
+            return self._cache_name
+
+        path = f"{self._base_path}/cachedContents?key={self.api_key}"
+        payload = {
+            "model": f"models/{self.model}",
+            "contents": [{
+                "role": "user",
+                "parts": [{
+                    "text": _TDL_CACHED_INSTRUCTION
+                }]
+            }],
+            "ttl": f"{_CONTEXT_CACHE_TTL}s"
+        }
+        self._cache_name = self._call_json('POST', path, payload)["name"]
+        # Renew a minute early rather than race the expiry
+        self._cache_expires = time.monotonic() + _CONTEXT_CACHE_TTL - 60
+        return self._cache_name
 
-        return response
+    def _clean_tdl(self, response: str) -> str:
+        """Strip code fences from generated TDL."""
+        # Extract from code block, if any
+        match = _FENCE_RE.search(response)
+        if match:
+            return match.group(1).strip()
+        return response.strip()
 
 
 def test_connection(api_key: str) -> bool:
@@ -426,7 +1455,7 @@ def test_connection(api_key: str) -> bool:
     """
     try:
         client = GeminiClient(api_key)
-        response = client.generate_content("Hello", temperature=0.1, max_tokens=50)
+        response = client.generate_content("Hello", temperature=0.1, max_tokens=50, cache=False)
         # Even empty response means API is working
         return True
     except Exception as e:
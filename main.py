@@ -5,14 +5,36 @@ Uses Google Gemini API to understand natural language and generate TDL documents
 Research Focus: LLM-based understanding of user requirements for industrial robotics
 """
 import argparse
+import hashlib
+import io
+import json
 import sys
 import os
+import re
+import time
 from pathlib import Path
 from datetime import datetime
+from typing import List, Optional
 
-from llm_client import GeminiClient, test_connection
-from analyzer import LLMRequirementAnalyzer
-from tdl_generator import LLMTDLGenerator
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard json module is used instead
+    orjson = None
+
+# The LLM client modules (and asyncio) are imported where they are first
+# needed, so --help and argument errors return without loading them
+
+
+# API keys that passed the connection test, and how long that is trusted
+VALIDATED_KEYS_FILE = Path("~/.cache/nltdl/validated_keys.json").expanduser()
+VALIDATION_TTL = 24 * 60 * 60
+
+# First config.txt line that is either "GEMINI_API_KEY=<key>" or a bare key
+# (comment lines and other settings are skipped)
+_CONFIG_KEY_RE = re.compile(
+    r'^[ \t]*(?:GEMINI_API_KEY[ \t]*=(?P<value>[^\n]*)|(?P<bare>[^#=\s][^=\n]*))$',
+    re.MULTILINE
+)
 
 
 def print_banner():
@@ -27,6 +49,44 @@ def print_banner():
     print(banner)
 
 
+def _key_id(api_key: str) -> str:
+    """Identify API key without storing it."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+def _load_validated_keys() -> dict:
+    """Load key id -> validation timestamp map (empty if unavailable)."""
+    try:
+        with open(VALIDATED_KEYS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _recently_validated(api_key: str) -> bool:
+    """Check whether API key passed the connection test within the TTL."""
+    validated_at = _load_validated_keys().get(_key_id(api_key), 0)
+    return time.time() - validated_at < VALIDATION_TTL
+
+
+def _mark_validated(api_key: str):
+    """Remember that API key passed the connection test (best effort)."""
+    now = time.time()
+    keys = {
+        key_id: validated_at
+        for key_id, validated_at in _load_validated_keys().items()
+        if now - validated_at < VALIDATION_TTL
+    }
+    keys[_key_id(api_key)] = now
+
+    try:
+        VALIDATED_KEYS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(VALIDATED_KEYS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(keys, f)
+    except OSError:
+        pass
+
+
 def setup_api_key(args) -> str:
     """
     Setup and validate API key.
@@ -48,18 +108,9 @@ def setup_api_key(args) -> str:
         config_file = Path(__file__).parent / "config.txt"
         if config_file.exists():
             try:
-                with open(config_file, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and not line.startswith('#'):
-                            if '=' in line:
-                                key, value = line.split('=', 1)
-                                if key.strip() == "GEMINI_API_KEY":
-                                    api_key = value.strip()
-                                    break
-                            else:
-                                api_key = line
-                                break
+                match = _CONFIG_KEY_RE.search(config_file.read_text())
+                if match:
+                    api_key = (match.group('value') or match.group('bare') or "").strip()
             except Exception as e:
                 print(f"[WARNING]  Warning: Failed to read config file: {e}")
 
@@ -72,17 +123,193 @@ def setup_api_key(args) -> str:
         print("\nGet your API key from: https://aistudio.google.com/app/apikey")
         sys.exit(1)
 
-    # Test connection
+    # Test connection, unless the key is known to work
+    if args.skip_connection_test or _recently_validated(api_key):
+        return api_key
+
+    from llm_client import test_connection
+
     print("\n[INFO] Testing API connection...")
     if not test_connection(api_key):
         print("[ERROR] API connection test failed!")
         print("Please check your API key and internet connection.")
         sys.exit(1)
 
+    _mark_validated(api_key)
     print("[OK] API connection successful")
     return api_key
 
 
+def load_requirements(batch_file: Path) -> List[str]:
+    """
+    Read requirements for batch mode.
+
+    Args:
+        batch_file: Text file with one requirement per line (blank lines and
+            lines starting with # are skipped)
+
+    Returns:
+        List of requirements
+    """
+    with open(batch_file, 'r', encoding='utf-8') as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith('#')]
+
+
+def default_output_path(output_dir: str, analysis, suffix: str = "") -> Path:
+    """Build timestamped TDL output path named after the task actions."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    task_name = "_".join(analysis.actions[:2]) if analysis.actions else "task"
+    return Path(output_dir) / f"tdl_{task_name}_{timestamp}{suffix}.tdl"
+
+
+def stream_tdl(generator, analysis, out) -> int:
+    """
+    Write TDL chunks to `out` as the LLM generates them.
+
+    Args:
+        generator: TDL generator
+        analysis: Requirement analysis to generate the TDL from
+        out: Text file object
+
+    Returns:
+        Number of characters written
+    """
+    written = 0
+    for chunk in generator.stream_generate(analysis):
+        out.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def save_tdl(output_path: Path, tdl_content: str, analysis) -> Path:
+    """
+    Save TDL document and its analysis metadata.
+
+    Args:
+        output_path: TDL file path (its directory is created if needed)
+        tdl_content: TDL document
+        analysis: Requirement analysis, saved next to the TDL as .json
+
+    Returns:
+        Metadata file path
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(tdl_content)
+
+    metadata_path = output_path.with_suffix('.json')
+    if orjson is not None:
+        metadata_path.write_bytes(orjson.dumps(analysis.to_dict(), option=orjson.OPT_INDENT_2))
+    else:
+        with open(metadata_path, 'w', encoding='utf-8') as f:
+            json.dump(analysis.to_dict(), f, ensure_ascii=False, indent=2)
+
+    return metadata_path
+
+
+def save_explanation(explain_path: Path, requirement: str, explanation: str):
+    """Save TDL explanation with a short header."""
+    header = (
+        f"TDL Document Explanation\n"
+        f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"Original Request: {requirement}\n"
+        f"{'=' * 60}\n\n"
+    )
+    with open(explain_path, 'w', encoding='utf-8') as f:
+        f.write(header + explanation)
+
+
+async def _generate_all(requirements: List[str], analyzer, concurrency: int, explain: bool) -> list:
+    """Run analyze_and_generate for all requirements, `concurrency` at a time."""
+    import asyncio
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(requirement):
+        async with semaphore:
+            return await analyzer.aanalyze_and_generate(requirement, explain=explain)
+
+    return await asyncio.gather(
+        *(run_one(requirement) for requirement in requirements),
+        return_exceptions=True
+    )
+
+
+def run_batch(args, analyzer, generator):
+    """
+    Convert all requirements of the batch file with concurrent LLM requests.
+
+    Args:
+        args: Command line arguments
+        analyzer: Requirement analyzer
+        generator: TDL generator
+
+    Raises:
+        SystemExit: If the batch file cannot be read or any conversion fails
+    """
+    try:
+        requirements = load_requirements(Path(args.batch))
+    except OSError as e:
+        print(f"\n[ERROR] Failed to read batch file: {e}")
+        sys.exit(1)
+
+    if not requirements:
+        print(f"\n[WARNING]  No requirements found in {args.batch}")
+        sys.exit(0)
+
+    print("\n" + "="*60)
+    print(f"BATCH: {len(requirements)} requirement(s), {args.concurrency} concurrent request(s)")
+    print("="*60)
+
+    import asyncio
+
+    results = asyncio.run(_generate_all(requirements, analyzer, args.concurrency, args.explain))
+
+    failed = 0
+    for index, (requirement, result) in enumerate(zip(requirements, results), 1):
+        print(f"\n[{index}/{len(requirements)}] {requirement}")
+
+        if isinstance(result, Exception):
+            print(f"[ERROR] {result}")
+            failed += 1
+            continue
+
+        analysis, tdl_content, explanation = result
+
+        try:
+            tdl_content = generator.finalize_tdl(tdl_content, validate=not args.no_validation)
+            if args.explain and explanation is None:
+                explanation = generator.explain_tdl(tdl_content)
+
+            if args.print_only:
+                print("-" * 60)
+                print(tdl_content)
+                print("-" * 60)
+                if explanation is not None:
+                    print(explanation)
+                continue
+
+            output_path = default_output_path(args.output_dir, analysis, f"_{index:03d}")
+            save_tdl(output_path, tdl_content, analysis)
+            print(f"[OK] Saved: {output_path.absolute()}")
+
+            if explanation is not None:
+                save_explanation(output_path.with_suffix('.txt'), requirement, explanation)
+
+        except Exception as e:
+            print(f"[ERROR] {e}")
+            failed += 1
+
+    print("\n" + "="*60)
+    print(f"[DONE] Batch completed: {len(requirements) - failed} succeeded, {failed} failed")
+    print("="*60)
+
+    if failed:
+        sys.exit(1)
+
+
 def main():
     """Main application entry point."""
     parser = argparse.ArgumentParser(
@@ -95,17 +322,24 @@ Examples:
   python main.py -r "용접 작업 수행" --api-key YOUR_API_KEY
   python main.py -r "조립하기" --interactive
   python main.py -r "이동" --explain
+  python main.py --batch requirements.txt --concurrency 8
 
 Get your Gemini API key from: https://aistudio.google.com/app/apikey
         """
     )
 
-    parser.add_argument(
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
         "-r", "--requirement",
         type=str,
-        required=True,
         help="Natural language requirement (Korean or English)"
     )
+    source.add_argument(
+        "--batch",
+        type=str,
+        metavar="FILE",
+        help="Convert every requirement in FILE (one per line) with concurrent LLM requests"
+    )
     parser.add_argument(
         "--api-key",
         type=str,
@@ -144,31 +378,72 @@ Get your Gemini API key from: https://aistudio.google.com/app/apikey
         action="store_true",
         help="Skip TDL validation checks"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the LLM instead of reusing results of identical requirements"
+    )
+    parser.add_argument(
+        "--skip-connection-test",
+        action="store_true",
+        help="Skip the API connection test (it is also skipped for 24h after a key passes it)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of simultaneous LLM requests in batch mode (default: 8)"
+    )
 
     args = parser.parse_args()
 
+    if args.batch and (args.interactive or args.output):
+        parser.error("--interactive and --output cannot be used with --batch")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
     # Print banner
     print_banner()
 
     # Setup API key
     api_key = setup_api_key(args)
 
+    from analyzer import LLMRequirementAnalyzer
+    from tdl_generator import LLMTDLGenerator
+
+    analyzer = LLMRequirementAnalyzer(
+        api_key, result_cache=not args.no_cache, response_cache=not args.no_cache
+    )
+    generator = LLMTDLGenerator(api_key, response_cache=not args.no_cache)
+
+    if args.batch:
+        run_batch(args, analyzer, generator)
+        return
+
     print("\n" + "="*60)
     print("STEP 1: Analyzing Natural Language Requirement")
     print("="*60)
     print(f"Input: {args.requirement}")
 
-    # Step 1: Analyze requirement using LLM
+    # Step 1: Analyze requirement, generate TDL (and explanation) in a
+    # single LLM request
     try:
-        analyzer = LLMRequirementAnalyzer(api_key)
-        analysis = analyzer.analyze(args.requirement)
+        analysis, tdl_content, explanation = analyzer.analyze_and_generate(
+            args.requirement, explain=args.explain
+        )
 
         print("\n" + analysis.summary())
 
         # Interactive verification
         if args.interactive:
+            original = analysis.to_dict()
             analysis = analyzer.interactive_correction(analysis)
 
+            # The TDL was generated from the uncorrected analysis
+            if analysis.to_dict() != original:
+                tdl_content = None
+                explanation = None
+
         # Validate analysis
         if not analyzer.validate_analysis(analysis):
             print("\n[WARNING]  Warning: Analysis may be incomplete!")
@@ -183,17 +458,32 @@ Get your Gemini API key from: https://aistudio.google.com/app/apikey
     print("STEP 2: Generating TDL Document with LLM")
     print("="*60)
 
-    # Step 2: Generate TDL using LLM
+    # Determine output path
+    if args.print_only:
+        output_path = None
+    elif args.output:
+        output_path = Path(args.output_dir) / args.output
+    else:
+        output_path = default_output_path(args.output_dir, analysis)
+
+    # Step 2: Generate TDL using LLM (only needed if the analysis was
+    # corrected after the combined request). The document is streamed into
+    # memory as it is generated and cleaned up in a final pass; only the
+    # cleaned-up document is printed or saved, so a failed generation
+    # leaves no partial file behind.
+    streamed = tdl_content is None
     try:
-        generator = LLMTDLGenerator(api_key)
+        if streamed:
+            buffer = io.StringIO()
+            written = stream_tdl(generator, analysis, buffer)
+            tdl_content = buffer.getvalue()
 
-        if args.no_validation:
-            tdl_content = generator.generate(analysis)
-            tdl_content = generator.post_process_tdl(tdl_content)
-        else:
-            tdl_content = generator.generate_with_validation(analysis)
+        tdl_content = generator.finalize_tdl(tdl_content, validate=not args.no_validation)
 
-        print(f"\n[OK] TDL document generated ({len(tdl_content)} characters)")
+        if streamed:
+            print(f"\n[OK] TDL document generated ({written} characters, streamed)")
+        else:
+            print(f"\n[OK] TDL document generated ({len(tdl_content)} characters)")
 
     except Exception as e:
         print(f"\n[ERROR] Error during TDL generation: {e}")
@@ -210,33 +500,13 @@ Get your Gemini API key from: https://aistudio.google.com/app/apikey
         print(tdl_content)
         print("-" * 60)
     else:
-        # Determine output path
-        if args.output:
-            output_path = Path(args.output_dir) / args.output
-        else:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            task_name = "_".join(analysis.actions[:2]) if analysis.actions else "task"
-            filename = f"tdl_{task_name}_{timestamp}.tdl"
-            output_path = Path(args.output_dir) / filename
-
-        # Create output directory
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-
-        # Save TDL file
+        # Save TDL file (and analysis metadata)
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(tdl_content)
+            metadata_path = save_tdl(output_path, tdl_content, analysis)
 
             print(f"\n[OK] TDL file saved successfully!")
             print(f"[FILE] Output file: {output_path.absolute()}")
             print(f"[SIZE] File size: {output_path.stat().st_size} bytes")
-
-            # Also save analysis metadata
-            metadata_path = output_path.with_suffix('.json')
-            import json
-            with open(metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(analysis.to_dict(), f, ensure_ascii=False, indent=2)
-
             print(f"[INFO] Metadata saved: {metadata_path.absolute()}")
 
         except Exception as e:
@@ -250,18 +520,14 @@ Get your Gemini API key from: https://aistudio.google.com/app/apikey
         print("="*60)
 
         try:
-            explanation = generator.explain_tdl(tdl_content)
+            if explanation is None:
+                explanation = generator.explain_tdl(tdl_content)
             print(f"\n{explanation}")
 
             # Save explanation if saving to file
             if not args.print_only:
                 explain_path = output_path.with_suffix('.txt')
-                with open(explain_path, 'w', encoding='utf-8') as f:
-                    f.write(f"TDL Document Explanation\n")
-                    f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write(f"Original Request: {args.requirement}\n")
-                    f.write("="*60 + "\n\n")
-                    f.write(explanation)
+                save_explanation(explain_path, args.requirement, explanation)
 
                 print(f"\n[EXPLAIN] Explanation saved: {explain_path.absolute()}")
 
@@ -2,33 +2,74 @@
 Inverse Kinematics Solver using PyBullet
 Converts Cartesian poses (PosX) to joint angles (PosJ).
 """
+import re
+from collections import namedtuple
 import pybullet as p
 import numpy as np
-from typing import List, Tuple, Optional
-import math
+from typing import Dict, List, Tuple, Optional
+
+
+# PosX/PosJ pose with its coordinate list
+_POSE_RE = re.compile(r'Pos(?P<kind>[XJ])\((?P<coords>.*?)\)')
+
+# Many poses stored as one array per field (row i belongs to pose i):
+#   kinds:        'X' (cartesian), 'J' (joint) or '' (not a pose), shape (N,)
+#   positions:    x, y, z of cartesian poses, shape (N, 3)
+#   orientations: rx, ry, rz of cartesian poses, shape (N, 3)
+#   joints:       joint angles of joint poses, shape (N, max joint count), NaN-padded
+#   sizes:        number of coordinates given for each pose, shape (N,)
+PoseBatch = namedtuple('PoseBatch', 'kinds, positions, orientations, joints, sizes')
+
+# (URDF path, body ID) -> (number of joints, controllable joint indices)
+_JOINT_INFO_CACHE: Dict[Tuple[str, int], Tuple[int, List[int]]] = {}
 
 
 class IKSolver:
     """Inverse Kinematics solver using PyBullet's IK engine."""
 
-    def __init__(self, robot_id: int, end_effector_link_index: int):
+    def __init__(
+        self,
+        robot_id: int,
+        end_effector_link_index: int,
+        urdf_path: Optional[str] = None
+    ):
         """
         Initialize IK solver.
 
         Args:
             robot_id: PyBullet robot body ID
             end_effector_link_index: Index of end effector link
+            urdf_path: URDF the robot was loaded from; if given, the joint
+                enumeration is cached for later solvers of the same body
         """
         self.robot_id = robot_id
         self.ee_link_index = end_effector_link_index
-        self.num_joints = p.getNumJoints(robot_id)
 
-        # Get controllable joints
-        self.joint_indices = []
-        for i in range(self.num_joints):
-            joint_info = p.getJointInfo(robot_id, i)
-            if joint_info[2] != p.JOINT_FIXED:  # Not a fixed joint
-                self.joint_indices.append(i)
+        # Default IK orientation (pointing down), computed once
+        self._default_orn = p.getQuaternionFromEuler([0, np.pi/2, 0])
+
+        cache_key = (urdf_path, robot_id) if urdf_path else None
+        cached = _JOINT_INFO_CACHE.get(cache_key)
+
+        if cached is not None:
+            self.num_joints = cached[0]
+            self.joint_indices = list(cached[1])
+        else:
+            self.num_joints = p.getNumJoints(robot_id)
+
+            # Get controllable joints
+            self.joint_indices = []
+            for i in range(self.num_joints):
+                joint_info = p.getJointInfo(robot_id, i)
+                if joint_info[2] != p.JOINT_FIXED:  # Not a fixed joint
+                    self.joint_indices.append(i)
+
+            if cache_key is not None:
+                _JOINT_INFO_CACHE[cache_key] = (self.num_joints, list(self.joint_indices))
+
+        # Joint indices as one tuple, for resetting all joints in one call
+        self._joint_indices_tuple = tuple(self.joint_indices)
+        self._num_controlled = len(self._joint_indices_tuple)
 
         print(f"[IK] Initialized with {len(self.joint_indices)} controllable joints")
 
@@ -49,30 +90,88 @@ class IKSolver:
         Returns:
             Joint angles in radians, or None if IK fails
         """
-        # Default orientation (pointing down)
-        if target_orn is None:
-            target_orn = p.getQuaternionFromEuler([0, np.pi/2, 0])
-
-        # Set current joint positions if provided
-        if current_joints:
-            for i, joint_idx in enumerate(self.joint_indices):
-                if i < len(current_joints):
-                    p.resetJointState(self.robot_id, joint_idx, current_joints[i])
-
-        # Solve IK
-        joint_positions = p.calculateInverseKinematics(
-            bodyUniqueId=self.robot_id,
-            endEffectorLinkIndex=self.ee_link_index,
-            targetPosition=target_pos,
-            targetOrientation=target_orn,
-            maxNumIterations=100,
-            residualThreshold=1e-4
-        )
+        return self.solve_ik_batch([(target_pos, target_orn)], current_joints)[0]
+
+    def solve_ik_batch(
+        self,
+        targets: List[Tuple[Tuple[float, float, float], Optional[Tuple[float, float, float, float]]]],
+        seed: Optional[List[float]] = None
+    ) -> List[List[float]]:
+        """
+        Solve inverse kinematics for a sequence of target poses.
+
+        Each target is solved starting from the solution of the previous one,
+        which keeps consecutive waypoints of a path on the same IK branch.
+
+        Args:
+            targets: (position, orientation quaternion or None) per target
+            seed: Joint configuration to start the first solve from
+                (default: current robot state)
 
-        # Extract only controllable joint positions
-        result = [joint_positions[i] for i in range(len(self.joint_indices))]
+        Returns:
+            Joint angles in radians for each target
+        """
+        num_controllable = self._num_controlled
+        solutions = []
+
+        for target_pos, target_orn in targets:
+            # Default orientation (pointing down)
+            if target_orn is None:
+                target_orn = self._default_orn
+
+            # Start from the seed (previous solution after the first target)
+            if seed is not None and len(seed) > 0:
+                self._set_joint_positions(seed)
+
+            # Solve IK
+            joint_positions = p.calculateInverseKinematics(
+                bodyUniqueId=self.robot_id,
+                endEffectorLinkIndex=self.ee_link_index,
+                targetPosition=target_pos,
+                targetOrientation=target_orn,
+                maxNumIterations=100,
+                residualThreshold=1e-4
+            )
+
+            # Extract only controllable joint positions
+            seed = list(joint_positions[:num_controllable])
+            solutions.append(seed)
+
+        return solutions
+
+    def solve_ik_from_euler_batch(
+        self,
+        poses: np.ndarray,
+        seed: Optional[List[float]] = None
+    ) -> np.ndarray:
+        """
+        Solve inverse kinematics along a path of Cartesian poses.
 
-        return result
+        The Euler angles of all poses are converted to quaternions in one
+        NumPy call before the warm-started solves of solve_ik_batch.
+
+        Args:
+            poses: (N, 6) target poses (x, y, z, rx, ry, rz) in meters and radians
+            seed: Joint configuration to start the first solve from
+
+        Returns:
+            (N, number of controllable joints) array of joint angles in radians
+        """
+        poses = np.asarray(poses, dtype=np.float64)
+        targets = list(zip(
+            poses[:, :3].tolist(),
+            euler_to_quaternions(poses[:, 3:6]).tolist()
+        ))
+        return np.array(self.solve_ik_batch(targets, seed), dtype=np.float64)
+
+    def _set_joint_positions(self, joints: List[float]):
+        """Reset controllable joints to the given angles in one PyBullet call."""
+        count = min(len(joints), self._num_controlled)
+        p.resetJointStatesMultiDof(
+            self.robot_id,
+            self._joint_indices_tuple[:count],
+            [[value] for value in joints[:count]]
+        )
 
     def solve_ik_from_euler(
         self,
@@ -105,18 +204,58 @@ class IKSolver:
         Returns:
             Tuple of (position, orientation_euler) in meters and radians
         """
-        # Set joint positions
-        for i, joint_idx in enumerate(self.joint_indices):
-            if i < len(joint_angles):
-                p.resetJointState(self.robot_id, joint_idx, joint_angles[i])
+        positions, orientations = self.forward_kinematics_batch([joint_angles])
+        return positions[0].tolist(), orientations[0].tolist()
+
+    def forward_kinematics_batch(self, joint_angles_list) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute forward kinematics for many joint configurations.
+
+        Each configuration costs one joint reset and one link state query.
+
+        Args:
+            joint_angles_list: Joint angles in radians, one row per configuration
+
+        Returns:
+            Tuple of (positions, orientations_euler) as (N, 3) arrays in
+            meters and radians
+        """
+        count = len(joint_angles_list)
+        positions = np.empty((count, 3), dtype=np.float64)
+        orientations = np.empty((count, 3), dtype=np.float64)
+
+        for i, joint_angles in enumerate(joint_angles_list):
+            # Set joint positions
+            self._set_joint_positions(joint_angles)
+
+            # Get end effector state
+            link_state = p.getLinkState(self.robot_id, self.ee_link_index)
+            positions[i] = link_state[0]
+            orientations[i] = p.getEulerFromQuaternion(link_state[1])
 
-        # Get end effector state
-        link_state = p.getLinkState(self.robot_id, self.ee_link_index)
-        position = list(link_state[0])
-        orientation_quat = list(link_state[1])
-        orientation_euler = list(p.getEulerFromQuaternion(orientation_quat))
+        return positions, orientations
 
-        return position, orientation_euler
+
+def euler_to_quaternions(euler: np.ndarray) -> np.ndarray:
+    """
+    Convert Euler angles to quaternions, like p.getQuaternionFromEuler.
+
+    Args:
+        euler: (N, 3) roll, pitch, yaw in radians
+
+    Returns:
+        (N, 4) quaternions (x, y, z, w)
+    """
+    half = np.asarray(euler, dtype=np.float64) * 0.5
+    cos_roll, cos_pitch, cos_yaw = np.cos(half).T
+    sin_roll, sin_pitch, sin_yaw = np.sin(half).T
+
+    return np.stack([
+        sin_roll * cos_pitch * cos_yaw - cos_roll * sin_pitch * sin_yaw,
+        cos_roll * sin_pitch * cos_yaw + sin_roll * cos_pitch * sin_yaw,
+        cos_roll * cos_pitch * sin_yaw - sin_roll * sin_pitch * cos_yaw,
+        cos_roll * cos_pitch * cos_yaw + sin_roll * sin_pitch * sin_yaw,
+    ], axis=-1)
 
 
 def parse_tdl_pose(pose_str: str) -> dict:
@@ -127,34 +266,78 @@ def parse_tdl_pose(pose_str: str) -> dict:
         pose_str: TDL pose string like "PosX(300, 200, 50, 0, 0, 0)"
 
     Returns:
-        Dictionary with pose information
+        Dictionary with pose information (coordinates as NumPy arrays)
     """
-    import re
-
     # PosX: Cartesian position (x, y, z, rx, ry, rz)
-    if pose_str.startswith('PosX('):
-        match = re.search(r'PosX\((.*?)\)', pose_str)
-        if match:
-            coords_str = match.group(1)
-            coords = [float(c.strip()) for c in coords_str.split(',')]
-            return {
-                'type': 'cartesian',
-                'position': coords[:3],  # x, y, z in mm
-                'orientation': coords[3:6] if len(coords) >= 6 else [0, 0, 0]  # rx, ry, rz in degrees
-            }
-
     # PosJ: Joint angles (j1, j2, j3, j4, j5, j6)
-    elif pose_str.startswith('PosJ('):
-        match = re.search(r'PosJ\((.*?)\)', pose_str)
-        if match:
-            coords_str = match.group(1)
-            coords = [float(c.strip()) for c in coords_str.split(',')]
-            return {
-                'type': 'joint',
-                'joints': coords  # Joint angles in degrees
-            }
+    match = _POSE_RE.match(pose_str)
+    if not match:
+        return None
+
+    coords = np.array(match.group('coords').split(','), dtype=np.float64)
+    return _make_pose(match.group('kind'), coords)
+
+
+def parse_tdl_poses(pose_strs: List[str]) -> PoseBatch:
+    """
+    Parse many TDL pose strings at once into a PoseBatch.
 
-    return None
+    The coordinates of all poses are converted to floats in a single NumPy
+    call, and stored in contiguous arrays instead of one dictionary per pose.
+
+    Args:
+        pose_strs: TDL pose strings
+
+    Returns:
+        PoseBatch in TDL units (mm, degrees); kinds is '' where a string is
+        not a pose
+    """
+    count = len(pose_strs)
+    matches = [_POSE_RE.match(pose_str) for pose_str in pose_strs]
+    rows = [row for row, match in enumerate(matches) if match]
+    coords_strs = [matches[row].group('coords') for row in rows]
+
+    kinds = np.full(count, '', dtype='<U1')
+    sizes = np.zeros(count, dtype=np.intp)
+    for row in rows:
+        kinds[row] = matches[row].group('kind')
+    sizes[rows] = [coords_str.count(',') + 1 for coords_str in coords_strs]
+
+    positions = np.zeros((count, 3), dtype=np.float64)
+    orientations = np.zeros((count, 3), dtype=np.float64)
+    is_joint = kinds == 'J'
+    joints = np.full((count, sizes[is_joint].max(initial=0)), np.nan, dtype=np.float64)
+
+    if rows:
+        values = np.array(",".join(coords_strs).split(','), dtype=np.float64)
+        starts = np.cumsum(sizes[rows]) - sizes[rows]
+
+        for row, start in zip(rows, starts.tolist()):
+            size = sizes[row]
+            coords = values[start:start + size]
+            if is_joint[row]:
+                joints[row, :size] = coords
+            else:
+                positions[row, :min(size, 3)] = coords[:3]
+                if size >= 6:
+                    orientations[row] = coords[3:6]
+
+    return PoseBatch(kinds, positions, orientations, joints, sizes)
+
+
+def _make_pose(kind: str, coords: np.ndarray) -> dict:
+    """Build parsed pose dictionary from PosX/PosJ coordinates."""
+    if kind == 'X':
+        return {
+            'type': 'cartesian',
+            'position': coords[:3],  # x, y, z in mm
+            'orientation': coords[3:6] if len(coords) >= 6 else np.zeros(3)  # rx, ry, rz in degrees
+        }
+
+    return {
+        'type': 'joint',
+        'joints': coords  # Joint angles in degrees
+    }
 
 
 def convert_tdl_to_meters(pose_dict: dict) -> dict:
@@ -169,9 +352,9 @@ def convert_tdl_to_meters(pose_dict: dict) -> dict:
     """
     if pose_dict['type'] == 'cartesian':
         # Convert mm to meters
-        position_m = [p / 1000.0 for p in pose_dict['position']]
+        position_m = np.asarray(pose_dict['position'], dtype=np.float64) / 1000.0
         # Convert degrees to radians
-        orientation_rad = [math.radians(o) for o in pose_dict['orientation']]
+        orientation_rad = np.deg2rad(pose_dict['orientation'])
 
         return {
             'type': 'cartesian',
@@ -181,7 +364,7 @@ def convert_tdl_to_meters(pose_dict: dict) -> dict:
 
     elif pose_dict['type'] == 'joint':
         # Convert degrees to radians
-        joints_rad = [math.radians(j) for j in pose_dict['joints']]
+        joints_rad = np.deg2rad(pose_dict['joints'])
 
         return {
             'type': 'joint',
@@ -189,3 +372,21 @@ def convert_tdl_to_meters(pose_dict: dict) -> dict:
         }
 
     return pose_dict
+
+
+def convert_tdl_to_meters_batch(batch: PoseBatch) -> PoseBatch:
+    """
+    Convert PoseBatch from TDL units (mm, degrees) to PyBullet units
+    (meters, radians) with one array operation per field.
+
+    Args:
+        batch: Parsed TDL poses
+
+    Returns:
+        Converted PoseBatch
+    """
+    return batch._replace(
+        positions=batch.positions / 1000.0,
+        orientations=np.deg2rad(batch.orientations),
+        joints=np.deg2rad(batch.joints)
+    )
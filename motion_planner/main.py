@@ -8,20 +8,20 @@ Usage:
     python main.py input.tdl --robot universal --visualize
 """
 import argparse
+import logging
 import sys
 import os
+import time
 from pathlib import Path
 import json
 
-# PyBullet imports
-import pybullet as p
-import pybullet_data
+# PyBullet, NumPy and the planner modules are imported once the arguments
+# have been validated, so --help and usage errors return immediately
 
-# Local imports
-from robot_models import get_robot_model, create_simple_urdf
-from ik_solver import IKSolver
-from trajectory_planner import TrajectoryPlanner
-from tdl_motion_planner import load_and_plan_tdl
+
+# Identity orientation quaternion (x, y, z, w), as returned by
+# p.getQuaternionFromEuler([0, 0, 0])
+_IDENTITY_QUAT = (0.0, 0.0, 0.0, 1.0)
 
 
 def print_banner():
@@ -67,17 +67,22 @@ def detect_robot_from_report(tdl_file_path: Path) -> tuple:
     return None, None
 
 
-def setup_pybullet_simulation(robot_model, gui: bool = False):
+def setup_pybullet_simulation(robot_model, gui: bool = False, gravity: bool = True):
     """
     Setup PyBullet simulation environment.
 
     Args:
         robot_model: Robot model instance
         gui: Enable GUI visualization
+        gravity: Apply gravity (only matters when the simulation is stepped)
 
     Returns:
-        Tuple of (physics_client_id, robot_id, end_effector_link_index)
+        Tuple of (physics_client_id, robot_id, end_effector_link_index, urdf_path)
     """
+    import pybullet as p
+    import pybullet_data
+    from robot_models import ensure_urdf
+
     # Connect to PyBullet
     if gui:
         client_id = p.connect(p.GUI)
@@ -85,22 +90,30 @@ def setup_pybullet_simulation(robot_model, gui: bool = False):
     else:
         client_id = p.connect(p.DIRECT)
 
+    # Planning only uses IK and collision queries; the constraint solver
+    # is just exercised by the visualization loop, so keep it cheap
+    p.setPhysicsEngineParameter(
+        numSolverIterations=10,
+        enableFileCaching=1,
+        enableConeFriction=0
+    )
+
     # Set additional search path for PyBullet data
     p.setAdditionalSearchPath(pybullet_data.getDataPath())
 
     # Set gravity
-    p.setGravity(0, 0, -9.81)
+    if gravity:
+        p.setGravity(0, 0, -9.81)
 
     # Load ground plane
     plane_id = p.loadURDF("plane.urdf")
 
-    # Create robot URDF
-    urdf_path = Path(__file__).parent / f"temp_{robot_model.name}.urdf"
-    create_simple_urdf(robot_model, str(urdf_path))
+    # Create robot URDF (reused from the cache if already generated)
+    urdf_path = ensure_urdf(robot_model)
 
     # Load robot
     robot_start_pos = [0, 0, 0]
-    robot_start_orientation = p.getQuaternionFromEuler([0, 0, 0])
+    robot_start_orientation = _IDENTITY_QUAT
 
     robot_id = p.loadURDF(
         str(urdf_path),
@@ -117,7 +130,7 @@ def setup_pybullet_simulation(robot_model, gui: bool = False):
     print(f"[Simulation] Number of joints: {num_joints}")
     print(f"[Simulation] End effector link: {ee_link_index}")
 
-    return client_id, robot_id, ee_link_index
+    return client_id, robot_id, ee_link_index, urdf_path
 
 
 def main():
@@ -142,6 +155,9 @@ Examples:
   # Save motion plan to file
   python main.py task.tdl --robot doosan --save-plan
 
+  # Regenerate cached robot URDF files
+  python main.py task.tdl --robot doosan --clean-urdf-cache
+
 Supported Robots:
   - doosan    : Doosan Robotics (H2017, etc.)
   - universal : Universal Robots (UR10e, etc.)
@@ -184,9 +200,22 @@ Supported Robots:
         action="store_true",
         help="Save motion plan to JSON file"
     )
+    parser.add_argument(
+        "--clean-urdf-cache",
+        action="store_true",
+        help="Delete cached robot URDF files before planning"
+    )
 
     args = parser.parse_args()
 
+    # Planner modules log through `logging`; show their messages on stdout
+    # in the same "[LEVEL] message" form as the rest of the output
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(levelname)s] %(message)s",
+        stream=sys.stdout
+    )
+
     # Print banner
     print_banner()
 
@@ -219,6 +248,16 @@ Supported Robots:
         print("Use --robot <manufacturer> or --auto")
         sys.exit(1)
 
+    import pybullet as p
+    from robot_models import get_robot_model, clean_urdf_cache
+    from ik_solver import IKSolver
+    from trajectory_planner import TrajectoryPlanner
+    from tdl_motion_planner import load_and_plan_tdl
+
+    if args.clean_urdf_cache:
+        count = clean_urdf_cache()
+        print(f"[INFO] Removed {count} cached URDF file(s)")
+
     # Get robot model
     model = model or manufacturer
     robot_model = get_robot_model(manufacturer, model)
@@ -229,15 +268,16 @@ Supported Robots:
 
     # Setup PyBullet simulation
     print(f"\n[INFO] Setting up simulation...")
-    client_id, robot_id, ee_link_index = setup_pybullet_simulation(
+    client_id, robot_id, ee_link_index, urdf_path = setup_pybullet_simulation(
         robot_model,
-        gui=args.visualize
+        gui=args.visualize,
+        gravity=args.visualize
     )
 
     try:
         # Initialize IK solver
         print(f"\n[INFO] Initializing IK solver...")
-        ik_solver = IKSolver(robot_id, ee_link_index)
+        ik_solver = IKSolver(robot_id, ee_link_index, urdf_path=str(urdf_path))
 
         # Initialize trajectory planner
         print(f"[INFO] Initializing trajectory planner...")
@@ -266,20 +306,18 @@ Supported Robots:
         if args.visualize:
             print("\n[INFO] Visualization active. Press Ctrl+C to exit.")
             try:
+                # PyBullet steps in real time on its own; just stay alive
+                # without busy-waiting
+                p.setRealTimeSimulation(1)
                 while True:
-                    p.stepSimulation()
+                    time.sleep(0.1)
             except KeyboardInterrupt:
                 print("\n[INFO] Shutting down...")
 
     finally:
-        # Disconnect PyBullet
+        # Disconnect PyBullet (the URDF stays cached for the next run)
         p.disconnect()
 
-        # Clean up temporary URDF
-        urdf_path = Path(__file__).parent / f"temp_{robot_model.name}.urdf"
-        if urdf_path.exists():
-            urdf_path.unlink()
-
 
 if __name__ == "__main__":
     try:
@@ -2,132 +2,199 @@
 Robot Models and URDF Management
 Provides simplified robot models for motion planning when URDF files are not available.
 """
+import functools
+import hashlib
+import logging
+import os
+import re
 import numpy as np
+from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
 
+logger = logging.getLogger(__name__)
+
+# Generated URDF files, kept between runs
+URDF_CACHE_DIR = Path("~/.cache/nltdl/urdf").expanduser()
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    """Mark an array read-only so it can be shared between instances."""
+    array.setflags(write=False)
+    return array
+
+
 class RobotModel:
-    """Base class for robot kinematic models."""
+    """
+    Base class for robot kinematic models.
+
+    Subclasses declare their constant DH_PARAMS table, joint limits and home
+    position at class level. The DH table is stored once per class as a
+    read-only float32 array shared by all instances (dh_params). Joint
+    limits, a (dof, 2) array of [min, max] rows, and the home position are
+    read-only float64 arrays, since they are written into the URDF.
+    """
+
+    dof = 6  # Default 6-DOF
+    joint_limits = _readonly(np.empty((0, 2)))  # [[min, max], ...]
+    home_position = _readonly(np.empty(0))
+    DH_PARAMS = ()  # ((a, alpha, d, theta_offset), ...)
 
     def __init__(self, name: str, manufacturer: str):
         self.name = name
         self.manufacturer = manufacturer
-        self.dof = 6  # Default 6-DOF
-        self.joint_limits = []  # [(min, max), ...]
-        self.home_position = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'DH_PARAMS' in cls.__dict__:
+            cls._set_dh(cls, cls.DH_PARAMS)
+
+    @staticmethod
+    def _set_dh(target, dh_params):
+        """
+        Store DH parameters as a read-only float32 (joints, 4) array.
+
+        Args:
+            target: Class (shared by its instances) or instance to store them on
+            dh_params: Rows of [a, alpha, d, theta_offset]
+        """
+        target.dh_params = _readonly(np.asarray(dh_params, dtype=np.float32).reshape(-1, 4))
+
+    @property
+    def joint_lower(self) -> np.ndarray:
+        """Lower joint limits in radians."""
+        return self.joint_limits[:, 0]
+
+    @property
+    def joint_upper(self) -> np.ndarray:
+        """Upper joint limits in radians."""
+        return self.joint_limits[:, 1]
 
     def get_joint_limits(self) -> List[Tuple[float, float]]:
         """Get joint limits in radians."""
-        return self.joint_limits
+        return list(map(tuple, self.joint_limits.tolist()))
 
     def get_home_position(self) -> List[float]:
         """Get home position joint angles."""
-        return self.home_position
+        return self.home_position.tolist()
+
+
+RobotModel._set_dh(RobotModel, RobotModel.DH_PARAMS)
 
 
 class DoosanH2017Model(RobotModel):
     """Doosan H2017 robot model (20kg payload, 1.7m reach)."""
 
+    dof = 6
+    max_reach = 1.7  # meters
+
+    # Joint limits in radians (approximate)
+    joint_limits = _readonly(np.array([
+        [-np.pi, np.pi],      # Joint 1
+        [-np.pi, np.pi],      # Joint 2
+        [-np.pi, np.pi],      # Joint 3
+        [-np.pi, np.pi],      # Joint 4
+        [-np.pi, np.pi],      # Joint 5
+        [-np.pi, np.pi],      # Joint 6
+    ]))
+
+    # Home position (all zeros)
+    home_position = _readonly(np.zeros(6))
+
+    # DH parameters (approximate for H2017)
+    # [a, alpha, d, theta_offset]
+    DH_PARAMS = (
+        (0, np.pi/2, 0.151, 0),
+        (0.409, 0, 0, 0),
+        (0.367, 0, 0, 0),
+        (0, np.pi/2, 0.124, 0),
+        (0, -np.pi/2, 0.124, 0),
+        (0, 0, 0.126, 0)
+    )
+
     def __init__(self):
         super().__init__("H2017", "Doosan")
-        self.dof = 6
-
-        # Joint limits in radians (approximate)
-        self.joint_limits = [
-            (-np.pi, np.pi),      # Joint 1
-            (-np.pi, np.pi),      # Joint 2
-            (-np.pi, np.pi),      # Joint 3
-            (-np.pi, np.pi),      # Joint 4
-            (-np.pi, np.pi),      # Joint 5
-            (-np.pi, np.pi),      # Joint 6
-        ]
-
-        # Home position (all zeros)
-        self.home_position = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
-
-        # DH parameters (approximate for H2017)
-        # [a, alpha, d, theta_offset]
-        self.dh_params = [
-            [0, np.pi/2, 0.151, 0],
-            [0.409, 0, 0, 0],
-            [0.367, 0, 0, 0],
-            [0, np.pi/2, 0.124, 0],
-            [0, -np.pi/2, 0.124, 0],
-            [0, 0, 0.126, 0]
-        ]
-
-        self.max_reach = 1.7  # meters
 
 
 class UniversalUR10eModel(RobotModel):
     """Universal Robots UR10e model (12.5kg payload, 1.3m reach)."""
 
+    dof = 6
+    max_reach = 1.3  # meters
+
+    # Joint limits in radians (UR10e specs)
+    joint_limits = _readonly(np.array([
+        [-2*np.pi, 2*np.pi],  # Joint 1: ±360°
+        [-2*np.pi, 2*np.pi],  # Joint 2: ±360°
+        [-2*np.pi, 2*np.pi],  # Joint 3: ±360°
+        [-2*np.pi, 2*np.pi],  # Joint 4: ±360°
+        [-2*np.pi, 2*np.pi],  # Joint 5: ±360°
+        [-2*np.pi, 2*np.pi],  # Joint 6: ±360°
+    ]))
+
+    home_position = _readonly(np.array([0.0, -np.pi/2, 0.0, -np.pi/2, 0.0, 0.0]))
+
+    # DH parameters for UR10e
+    DH_PARAMS = (
+        (0, np.pi/2, 0.1807, 0),
+        (-0.6127, 0, 0, 0),
+        (-0.57155, 0, 0, 0),
+        (0, np.pi/2, 0.17415, 0),
+        (0, -np.pi/2, 0.11985, 0),
+        (0, 0, 0.11655, 0)
+    )
+
     def __init__(self):
         super().__init__("UR10e", "Universal Robots")
-        self.dof = 6
 
-        # Joint limits in radians (UR10e specs)
-        self.joint_limits = [
-            (-2*np.pi, 2*np.pi),  # Joint 1: ±360°
-            (-2*np.pi, 2*np.pi),  # Joint 2: ±360°
-            (-2*np.pi, 2*np.pi),  # Joint 3: ±360°
-            (-2*np.pi, 2*np.pi),  # Joint 4: ±360°
-            (-2*np.pi, 2*np.pi),  # Joint 5: ±360°
-            (-2*np.pi, 2*np.pi),  # Joint 6: ±360°
-        ]
 
-        self.home_position = [0.0, -np.pi/2, 0.0, -np.pi/2, 0.0, 0.0]
+class GenericRobotModel(RobotModel):
+    """Generic 6-DOF robot model for simulation."""
 
-        # DH parameters for UR10e
-        self.dh_params = [
-            [0, np.pi/2, 0.1807, 0],
-            [-0.6127, 0, 0, 0],
-            [-0.57155, 0, 0, 0],
-            [0, np.pi/2, 0.17415, 0],
-            [0, -np.pi/2, 0.11985, 0],
-            [0, 0, 0.11655, 0]
-        ]
+    dof = 6
 
-        self.max_reach = 1.3  # meters
+    # Generic joint limits
+    joint_limits = _readonly(np.array([[-np.pi, np.pi]] * 6))
 
-
-class GenericRobotModel(RobotModel):
-    """Generic 6-DOF robot model for simulation."""
+    home_position = _readonly(np.array([0.0, 0.0, np.pi/2, 0.0, np.pi/2, 0.0]))
 
     def __init__(self, reach_m: float = 1.0, payload_kg: float = 10.0):
         super().__init__("Generic6DOF", "Generic")
-        self.dof = 6
         self.max_reach = reach_m
         self.payload = payload_kg
 
-        # Generic joint limits
-        self.joint_limits = [
-            (-np.pi, np.pi),
-            (-np.pi, np.pi),
-            (-np.pi, np.pi),
-            (-np.pi, np.pi),
-            (-np.pi, np.pi),
-            (-np.pi, np.pi),
-        ]
-
-        self.home_position = [0.0, 0.0, np.pi/2, 0.0, np.pi/2, 0.0]
-
-        # Simplified DH parameters based on reach
+        # Simplified DH parameters based on reach (per instance)
         link_length = reach_m / 3.0
-        self.dh_params = [
+        self._set_dh(self, [
             [0, np.pi/2, link_length * 0.3, 0],
             [link_length, 0, 0, 0],
             [link_length, 0, 0, 0],
             [0, np.pi/2, link_length * 0.3, 0],
             [0, -np.pi/2, link_length * 0.2, 0],
             [0, 0, link_length * 0.2, 0]
-        ]
+        ])
+
 
+# Specific models by normalized (manufacturer, model) name, see _normalize_name
+_REGISTRY = {
+    ("doosan", "h2017"): DoosanH2017Model,
+    ("universal", "ur10e"): UniversalUR10eModel,
+}
 
+
+def _normalize_name(name: str) -> str:
+    """Lowercase a name and drop separators, so "H-2017" and "h2017" match."""
+    return re.sub(r'[-_\s]', '', name.lower())
+
+
+@functools.lru_cache(maxsize=32)
 def get_robot_model(manufacturer: str, model: str) -> RobotModel:
     """
     Get robot model by manufacturer and model name.
 
+    The instance is cached and shared by later calls with the same
+    arguments, so treat it as read-only.
+
     Args:
         manufacturer: Robot manufacturer (doosan, universal, etc.)
         model: Robot model name
@@ -135,31 +202,89 @@ def get_robot_model(manufacturer: str, model: str) -> RobotModel:
     Returns:
         RobotModel instance
     """
-    manufacturer = manufacturer.lower()
-    model = model.lower()
+    manufacturer = _normalize_name(manufacturer)
+    model = _normalize_name(model)
+
+    model_class = _REGISTRY.get((manufacturer, model))
+    if model_class is not None:
+        return model_class()
 
-    if manufacturer == "doosan":
-        if "h2017" in model or "h-2017" in model:
-            return DoosanH2017Model()
-    elif manufacturer == "universal":
-        if "ur10e" in model:
-            return UniversalUR10eModel()
+    # Longer names such as "doosanh2017cobot" still match by substring
+    for (known_manufacturer, known_model), model_class in _REGISTRY.items():
+        if known_manufacturer == manufacturer and known_model in model:
+            return model_class()
 
     # Default to generic model
-    print(f"[WARNING] No specific model for {manufacturer} {model}, using generic model")
+    logger.warning("No specific model for %s %s, using generic model", manufacturer, model)
     return GenericRobotModel()
 
 
-def create_simple_urdf(robot_model: RobotModel, output_path: str):
+def get_urdf_path(robot_model: RobotModel) -> Path:
     """
-    Create a simplified URDF file for PyBullet simulation.
+    Get path of the cached URDF file for a robot model.
+
+    The file name contains a hash of the model fields the URDF is generated
+    from, so a changed model gets a new file.
 
     Args:
         robot_model: Robot model
-        output_path: Path to save URDF file
+
+    Returns:
+        URDF file path inside URDF_CACHE_DIR
+    """
+    fields = (
+        robot_model.name,
+        robot_model.dof,
+        [(float(lower), float(upper)) for lower, upper in robot_model.joint_limits.tolist()],
+    )
+    cache_key = hashlib.md5(repr(fields).encode('utf-8')).hexdigest()[:12]
+    return URDF_CACHE_DIR / f"{robot_model.name}_{cache_key}.urdf"
+
+
+def ensure_urdf(robot_model: RobotModel) -> Path:
+    """
+    Get URDF file for a robot model, generating it only if not cached yet.
+
+    Args:
+        robot_model: Robot model
+
+    Returns:
+        URDF file path
     """
-    urdf_content = f"""<?xml version="1.0"?>
-<robot name="{robot_model.name}">
+    urdf_path = get_urdf_path(robot_model)
+
+    if not urdf_path.exists():
+        urdf_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write under a temporary name so a concurrent run never loads a
+        # partially written file
+        tmp_path = urdf_path.with_suffix(f".{os.getpid()}.tmp")
+        create_simple_urdf(robot_model, str(tmp_path))
+        os.replace(tmp_path, urdf_path)
+
+    return urdf_path
+
+
+def clean_urdf_cache() -> int:
+    """
+    Delete all cached URDF files.
+
+    Returns:
+        Number of deleted files
+    """
+    if not URDF_CACHE_DIR.exists():
+        return 0
+
+    count = 0
+    for urdf_path in URDF_CACHE_DIR.glob("*.urdf"):
+        urdf_path.unlink()
+        count += 1
+    return count
+
+
+# URDF templates of create_simple_urdf: header with the base link, one
+# block per revolute link and joint, and the end effector
+_URDF_HEADER = """<?xml version="1.0"?>
+<robot name="{name}">
 
   <!-- Base Link -->
   <link name="base_link">
@@ -184,19 +309,10 @@ def create_simple_urdf(robot_model: RobotModel, output_path: str):
 
 """
 
-    # Generate links and joints based on DH parameters
-    for i in range(robot_model.dof):
-        link_name = f"link_{i+1}"
-        joint_name = f"joint_{i+1}"
-        prev_link = "base_link" if i == 0 else f"link_{i}"
-
-        # Simplified link (cylinder)
-        link_length = 0.3 if i < robot_model.dof - 1 else 0.15
-
-        urdf_content += f"""  <!-- Link {i+1} -->
+_URDF_LINK = """  <!-- Link {index} -->
   <link name="{link_name}">
     <visual>
-      <origin xyz="0 0 {link_length/2}" rpy="0 0 0"/>
+      <origin xyz="0 0 {half_length}" rpy="0 0 0"/>
       <geometry>
         <cylinder radius="0.05" length="{link_length}"/>
       </geometry>
@@ -205,7 +321,7 @@ def create_simple_urdf(robot_model: RobotModel, output_path: str):
       </material>
     </visual>
     <collision>
-      <origin xyz="0 0 {link_length/2}" rpy="0 0 0"/>
+      <origin xyz="0 0 {half_length}" rpy="0 0 0"/>
       <geometry>
         <cylinder radius="0.05" length="{link_length}"/>
       </geometry>
@@ -216,19 +332,18 @@ def create_simple_urdf(robot_model: RobotModel, output_path: str):
     </inertial>
   </link>
 
-  <!-- Joint {i+1} -->
+  <!-- Joint {index} -->
   <joint name="{joint_name}" type="revolute">
     <parent link="{prev_link}"/>
     <child link="{link_name}"/>
     <origin xyz="0 0 {link_length}" rpy="0 0 0"/>
     <axis xyz="0 0 1"/>
-    <limit lower="{robot_model.joint_limits[i][0]}" upper="{robot_model.joint_limits[i][1]}" effort="100" velocity="2.0"/>
+    <limit lower="{lower}" upper="{upper}" effort="100" velocity="2.0"/>
   </joint>
 
 """
 
-    # End effector
-    urdf_content += f"""  <!-- End Effector -->
+_URDF_FOOTER = """  <!-- End Effector -->
   <link name="ee_link">
     <visual>
       <geometry>
@@ -241,7 +356,7 @@ def create_simple_urdf(robot_model: RobotModel, output_path: str):
   </link>
 
   <joint name="ee_joint" type="fixed">
-    <parent link="link_{robot_model.dof}"/>
+    <parent link="link_{dof}"/>
     <child link="ee_link"/>
     <origin xyz="0 0 0.15" rpy="0 0 0"/>
   </joint>
@@ -249,7 +364,37 @@ def create_simple_urdf(robot_model: RobotModel, output_path: str):
 </robot>
 """
 
+
+def create_simple_urdf(robot_model: RobotModel, output_path: str):
+    """
+    Create a simplified URDF file for PyBullet simulation.
+
+    Args:
+        robot_model: Robot model
+        output_path: Path to save URDF file
+    """
+    parts = [_URDF_HEADER.format(name=robot_model.name)]
+
+    # Generate links and joints based on DH parameters
+    for i in range(robot_model.dof):
+        # Simplified link (cylinder)
+        link_length = 0.3 if i < robot_model.dof - 1 else 0.15
+
+        parts.append(_URDF_LINK.format(
+            index=i + 1,
+            link_name=f"link_{i+1}",
+            joint_name=f"joint_{i+1}",
+            prev_link="base_link" if i == 0 else f"link_{i}",
+            link_length=link_length,
+            half_length=link_length / 2,
+            lower=float(robot_model.joint_limits[i, 0]),
+            upper=float(robot_model.joint_limits[i, 1])
+        ))
+
+    # End effector
+    parts.append(_URDF_FOOTER.format(dof=robot_model.dof))
+
     with open(output_path, 'w') as f:
-        f.write(urdf_content)
+        f.write("".join(parts))
 
-    print(f"[INFO] Generated URDF: {output_path}")
+    logger.info("Generated URDF: %s", output_path)
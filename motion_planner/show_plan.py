@@ -6,9 +6,17 @@ import json
 import sys
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard json module is used instead
+    orjson = None
+
 
 def load_motion_plan(json_path):
     """Load motion plan from JSON file."""
+    if orjson is not None:
+        return orjson.loads(Path(json_path).read_bytes())
+
     with open(json_path, 'r') as f:
         return json.load(f)
 
@@ -28,6 +36,12 @@ def print_motion_summary(motion_plan):
     print("GOAL-BY-GOAL BREAKDOWN")
     print("-"*70)
 
+    # Trajectory statistics, accumulated while printing the goals
+    total_motion_time = 0
+    total_non_motion_time = 0
+    motion_commands = 0
+    non_motion_commands = 0
+
     for goal_idx, goal_data in enumerate(motion_plan['goals'], 1):
         print(f"\n[{goal_idx}] GOAL: {goal_data['name']}")
         print(f"    Duration: {goal_data['duration']:.2f}s")
@@ -39,19 +53,31 @@ def print_motion_summary(motion_plan):
             if not traj:
                 continue
 
+            # Looked up once and shared by the statistics and the printout
+            traj_type = traj.get('type')
+            duration = traj.get('duration', 0)
+            is_non_motion = traj_type == 'non_motion'
+
+            if is_non_motion:
+                total_non_motion_time += duration
+                non_motion_commands += 1
+            elif 'waypoints' in traj:
+                total_motion_time += duration
+                motion_commands += 1
+
             if 'command' in traj:
                 print(f"\n    [{traj_idx}] {traj['command']}")
                 if 'target_pose' in traj:
                     print(f"        Target: {traj['target_pose']}")
                 if 'duration' in traj:
-                    print(f"        Duration: {traj['duration']:.3f}s")
+                    print(f"        Duration: {duration:.3f}s")
                 if 'num_waypoints' in traj:
                     print(f"        Waypoints: {traj['num_waypoints']}")
                 if 'type' in traj:
-                    print(f"        Type: {traj['type']}")
-            elif traj.get('type') == 'non_motion':
+                    print(f"        Type: {traj_type}")
+            elif is_non_motion:
                 print(f"    [{traj_idx}] {traj.get('command', 'Unknown')}")
-                print(f"        Duration: {traj.get('duration', 0):.3f}s")
+                print(f"        Duration: {duration:.3f}s")
                 if 'args' in traj:
                     print(f"        Args: {traj['args']}")
 
@@ -66,24 +92,6 @@ def print_motion_summary(motion_plan):
     print("TRAJECTORY STATISTICS")
     print("="*70)
 
-    # Calculate statistics
-    total_motion_time = 0
-    total_non_motion_time = 0
-    motion_commands = 0
-    non_motion_commands = 0
-
-    for goal_data in motion_plan['goals']:
-        for traj in goal_data['trajectories']:
-            if not traj:
-                continue
-            duration = traj.get('duration', 0)
-            if traj.get('type') == 'non_motion':
-                total_non_motion_time += duration
-                non_motion_commands += 1
-            elif 'waypoints' in traj:
-                total_motion_time += duration
-                motion_commands += 1
-
     print(f"\nMotion Commands: {motion_commands}")
     print(f"  Total time: {total_motion_time:.2f}s ({total_motion_time/motion_plan['total_duration']*100:.1f}%)")
 
@@ -2,17 +2,48 @@
 TDL Motion Planner Integration
 Connects TDL parser with motion planning system.
 """
+from __future__ import annotations
+
+import functools
+import logging
 import sys
 import os
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, List, Dict, Optional
 import json
 
-# Add parent directory to path for TDL parser import
-sys.path.append(str(Path(__file__).parent.parent / "job_converter"))
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard json module is used instead
+    orjson = None
+
+if TYPE_CHECKING:
+    from tdl_parser import TDLProgram, TDLGoal, TDLCommand
+
+logger = logging.getLogger(__name__)
+
+# The TDL parser (job_converter) and the IK helpers, which pull in
+# PyBullet, are only imported once a program is actually planned
+_JOB_CONVERTER_DIR = str(Path(__file__).parent.parent / "job_converter")
+
+
+@functools.lru_cache(maxsize=None)
+def _tdl_parser_module():
+    """Import the TDL parser module, adding job_converter to the path once."""
+    if _JOB_CONVERTER_DIR not in sys.path:
+        sys.path.append(_JOB_CONVERTER_DIR)
+
+    import tdl_parser
+    return tdl_parser
 
-from tdl_parser import TDLParser, TDLProgram, TDLGoal, TDLCommand
-from ik_solver import parse_tdl_pose, convert_tdl_to_meters
+
+def _json_default(obj):
+    """Serialize NumPy arrays and scalars left in a motion plan."""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 
 class TDLMotionPlanner:
@@ -32,6 +63,10 @@ class TDLMotionPlanner:
         self.current_joints = None
         self.tdl_program = tdl_program
 
+        # Target pose string (possibly a DEFINE name) -> (resolved pose
+        # string, converted pose); rebuilt for every planned program
+        self._pose_cache = {}
+
     def plan_tdl_program(self, tdl_program: TDLProgram) -> Dict:
         """
         Plan motion for entire TDL program.
@@ -44,6 +79,7 @@ class TDLMotionPlanner:
         """
         # Store program for definition resolution
         self.tdl_program = tdl_program
+        self._prepare_poses(tdl_program)
 
         motion_plan = {
             'goals': [],
@@ -54,7 +90,7 @@ class TDLMotionPlanner:
         }
 
         # Set initial position (home)
-        self.current_joints = [0.0] * 6  # Assume 6-DOF
+        self.current_joints = np.zeros(6, dtype=np.float32)  # Assume 6-DOF
 
         for goal in tdl_program.goals:
             goal_plan = self._plan_goal(goal)
@@ -64,16 +100,24 @@ class TDLMotionPlanner:
                 motion_plan['errors'].append(f"Failed to plan GOAL: {goal.name}")
                 continue
 
+            # Duration and waypoint count of the goal, in a single pass
+            duration = 0
+            num_waypoints = 0
+            for trajectory in goal_plan:
+                if trajectory:
+                    duration += trajectory.get('duration', 0)
+                    num_waypoints += trajectory.get('num_waypoints', 0)
+
             motion_plan['goals'].append({
                 'name': goal.name,
                 'trajectories': goal_plan,
-                'duration': sum(t.get('duration', 0) for t in goal_plan if t),
+                'duration': duration,
                 'num_commands': len(goal.commands)
             })
 
             # Update total statistics
-            motion_plan['total_duration'] += sum(t.get('duration', 0) for t in goal_plan if t)
-            motion_plan['total_waypoints'] += sum(t.get('num_waypoints', 0) for t in goal_plan if t)
+            motion_plan['total_duration'] += duration
+            motion_plan['total_waypoints'] += num_waypoints
 
         return motion_plan
 
@@ -87,16 +131,16 @@ class TDLMotionPlanner:
         Returns:
             List of trajectory dictionaries, or None if planning fails
         """
-        trajectories = []
+        trajectories = [None] * len(goal.commands)
 
-        for command in goal.commands:
+        for index, command in enumerate(goal.commands):
             trajectory = self._plan_command(command)
 
             if trajectory is None and self._is_motion_command(command):
-                print(f"[ERROR] Failed to plan command: {command.command_type}")
+                logger.error("Failed to plan command: %s", command.command_type)
                 return None
 
-            trajectories.append(trajectory)
+            trajectories[index] = trajectory
 
             # Update current position if motion command succeeded
             if trajectory and 'waypoints' in trajectory:
@@ -125,7 +169,7 @@ class TDLMotionPlanner:
             return self._plan_move_joint(args)
 
         elif cmd_type == "MoveCircular":
-            print(f"[WARNING] MoveCircular not yet implemented")
+            logger.warning("MoveCircular not yet implemented")
             return None
 
         # Non-motion commands (I/O, delay, etc.)
@@ -143,30 +187,83 @@ class TDLMotionPlanner:
             return self.tdl_program.definitions[pose_str]
         return pose_str
 
+    def _prepare_poses(self, tdl_program: TDLProgram):
+        """Resolve, parse and convert the target poses of all motion commands in one batch."""
+        from ik_solver import parse_tdl_poses, convert_tdl_to_meters_batch
+
+        self._pose_cache = {}
+
+        targets = list(dict.fromkeys(
+            command.args.get('target_pose', '')
+            for goal in tdl_program.goals
+            for command in goal.commands
+            if command.command_type in ('MoveLinear', 'MoveJoint')
+        ))
+        pose_strs = [self._resolve_pose(target) for target in targets]
+
+        try:
+            poses = convert_tdl_to_meters_batch(parse_tdl_poses(pose_strs))
+        except ValueError:
+            # Malformed coordinates; fail at the offending command instead
+            return
+
+        for row, (target, pose_str) in enumerate(zip(targets, pose_strs)):
+            self._pose_cache[target] = (pose_str, self._pose_at(poses, row))
+
+    def _resolve_and_parse(self, target: str) -> tuple:
+        """
+        Resolve DEFINE reference and look up the converted target pose.
+
+        Args:
+            target: Target pose string or DEFINE name
+
+        Returns:
+            Tuple of (resolved pose string, pose), where pose is (kind,
+            position, orientation, joints) in meters and radians ('X'
+            cartesian or 'J' joint), or None if not a pose
+        """
+        cached = self._pose_cache.get(target)
+        if cached is None:
+            from ik_solver import parse_tdl_poses, convert_tdl_to_meters_batch
+
+            pose_str = self._resolve_pose(target)
+            poses = convert_tdl_to_meters_batch(parse_tdl_poses([pose_str]))
+            cached = self._pose_cache[target] = (pose_str, self._pose_at(poses, 0))
+        return cached
+
+    @staticmethod
+    def _pose_at(poses, row: int) -> Optional[tuple]:
+        """Pose tuple of one PoseBatch row, or None if it is not a pose."""
+        kind = poses.kinds[row]
+        if not kind:
+            return None
+
+        return (
+            kind,
+            poses.positions[row],
+            poses.orientations[row],
+            poses.joints[row, :poses.sizes[row]]
+        )
+
     def _plan_move_linear(self, args: Dict) -> Optional[Dict]:
         """Plan MoveLinear command."""
-        target_pose_str = args.get('target_pose', '')
         velocity = args.get('velocity', 100)  # mm/s
         acceleration = args.get('acceleration', 50)  # mm/s²
 
-        # Resolve DEFINE reference
-        target_pose_str = self._resolve_pose(target_pose_str)
-
-        # Parse target pose
-        pose_dict = parse_tdl_pose(target_pose_str)
-        if not pose_dict:
-            print(f"[ERROR] Failed to parse pose: {target_pose_str}")
+        # Resolve DEFINE reference; parsed target pose in meters and radians
+        target_pose_str, pose = self._resolve_and_parse(args.get('target_pose', ''))
+        if pose is None:
+            logger.error("Failed to parse pose: %s", target_pose_str)
             return None
 
-        # Convert to meters and radians
-        pose_converted = convert_tdl_to_meters(pose_dict)
+        kind, position, orientation, joints = pose
 
-        if pose_converted['type'] == 'cartesian':
+        if kind == 'X':
             # Plan linear trajectory in Cartesian space
             trajectory = self.trajectory_planner.plan_linear_trajectory(
                 start_joints=self.current_joints,
-                goal_pos=tuple(pose_converted['position']),
-                goal_orn=tuple(pose_converted['orientation']),
+                goal_pos=tuple(position),
+                goal_orn=tuple(orientation),
                 ik_solver=self.ik_solver,
                 velocity=velocity,
                 acceleration=acceleration,
@@ -179,45 +276,40 @@ class TDLMotionPlanner:
 
             return trajectory
 
-        elif pose_converted['type'] == 'joint':
+        elif kind == 'J':
             # If joint pose given for linear move, treat as joint move
-            print(f"[WARNING] PosJ given for MoveLinear, using MoveJoint instead")
+            logger.warning("PosJ given for MoveLinear, using MoveJoint instead")
             return self._plan_move_joint(args)
 
         return None
 
     def _plan_move_joint(self, args: Dict) -> Optional[Dict]:
         """Plan MoveJoint command."""
-        target_pose_str = args.get('target_pose', '')
         velocity = args.get('velocity', 100)  # deg/s or mm/s
         acceleration = args.get('acceleration', 50)
 
-        # Resolve DEFINE reference
-        target_pose_str = self._resolve_pose(target_pose_str)
-
-        # Parse target pose
-        pose_dict = parse_tdl_pose(target_pose_str)
-        if not pose_dict:
-            print(f"[ERROR] Failed to parse pose: {target_pose_str}")
+        # Resolve DEFINE reference; parsed target pose in meters and radians
+        target_pose_str, pose = self._resolve_and_parse(args.get('target_pose', ''))
+        if pose is None:
+            logger.error("Failed to parse pose: %s", target_pose_str)
             return None
 
-        # Convert to meters and radians
-        pose_converted = convert_tdl_to_meters(pose_dict)
+        kind, position, orientation, joints = pose
 
         # Determine goal joints
-        if pose_converted['type'] == 'joint':
-            goal_joints = pose_converted['joints']
+        if kind == 'J':
+            goal_joints = joints
 
-        elif pose_converted['type'] == 'cartesian':
+        elif kind == 'X':
             # Solve IK to get joint configuration
             goal_joints = self.ik_solver.solve_ik_from_euler(
-                tuple(pose_converted['position']),
-                tuple(pose_converted['orientation']),
+                tuple(position),
+                tuple(orientation),
                 self.current_joints
             )
 
             if goal_joints is None:
-                print(f"[ERROR] IK failed for {target_pose_str}")
+                logger.error("IK failed for %s", target_pose_str)
                 return None
         else:
             return None
@@ -282,19 +374,19 @@ def load_and_plan_tdl(
         Motion plan dictionary
     """
     # Parse TDL file
-    parser = TDLParser()
+    parser = _tdl_parser_module().TDLParser()
     program = parser.parse_file(tdl_file_path)
 
-    print(f"[INFO] Parsed TDL: {len(program.goals)} GOALs")
+    logger.info("Parsed TDL: %d GOALs", len(program.goals))
 
     # Create motion planner
     motion_planner = TDLMotionPlanner(ik_solver, trajectory_planner)
 
     # Plan motion
-    print("[INFO] Planning motion...")
+    logger.info("Planning motion...")
     motion_plan = motion_planner.plan_tdl_program(program)
 
-    # Print summary
+    # Print summary (a report rather than log messages, so printed as is)
     print("\n" + "="*60)
     print("MOTION PLANNING SUMMARY")
     print("="*60)
@@ -320,9 +412,18 @@ def load_and_plan_tdl(
         tdl_path = Path(tdl_file_path)
         report_path = tdl_path.with_suffix('.motion_plan.json')
 
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(motion_plan, f, indent=2)
+        # Waypoints may still be NumPy arrays: orjson encodes them natively
+        # (non-contiguous ones through _json_default), json via _json_default
+        if orjson is not None:
+            report_path.write_bytes(orjson.dumps(
+                motion_plan,
+                default=_json_default,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            ))
+        else:
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(motion_plan, f, indent=2, default=_json_default)
 
-        print(f"\n[INFO] Motion plan saved to: {report_path}")
+        logger.info("Motion plan saved to: %s", report_path)
 
     return motion_plan
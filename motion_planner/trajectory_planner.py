@@ -2,33 +2,142 @@
 Trajectory Planner with Collision Detection
 Plans smooth, collision-free trajectories between waypoints.
 """
+import functools
 import pybullet as p
 import numpy as np
 from typing import List, Tuple, Optional, Dict
 import math
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the kernels then run as plain NumPy
+    njit = None
+
+
+# Moves whose goal is closer than this to the start (radians for joints
+# and orientations, meters for positions) are planned as stationary
+AT_GOAL_TOLERANCE = 1e-4
+
+# Stride of the first, coarsest collision sweep over a path
+COARSE_COLLISION_STRIDE = 8
+
+
+def _jit(func):
+    """Compile with Numba if it is installed."""
+    if njit is None:
+        return func
+    return njit(cache=True)(func)
+
+
+@_jit
+def _linear_path(start, goal, num_points):
+    """Points from start to goal at evenly spaced fractions, as (num_points, len(start))."""
+    if num_points > 1:
+        alphas = np.linspace(0.0, 1.0, num_points)
+    else:
+        alphas = np.ones(1)
+    return start + np.outer(alphas, goal - start)
+
+
+@_jit
+def _trapezoid_duration(distance, velocity, acceleration):
+    """Duration of a trapezoidal (or triangular) velocity profile over a distance."""
+    # Time to accelerate to max velocity
+    t_accel = velocity / acceleration
+
+    # Distance covered during acceleration
+    d_accel = 0.5 * acceleration * t_accel**2
+
+    # Check if we reach max velocity
+    if 2 * d_accel < distance:
+        # Trapezoidal profile (accel, cruise, decel)
+        d_cruise = distance - 2 * d_accel
+        t_cruise = d_cruise / velocity
+        total_time = 2 * t_accel + t_cruise
+    else:
+        # Triangular profile (accel, decel only)
+        t_accel = math.sqrt(distance / acceleration)
+        total_time = 2 * t_accel
+
+    return total_time
+
+
+@functools.lru_cache(maxsize=None)
+def _coarse_to_fine_order(count: int) -> Tuple[int, ...]:
+    """
+    Order in which to collision check the waypoints of a path.
+
+    Every COARSE_COLLISION_STRIDE-th waypoint and the last one come first,
+    then the midpoints between them, halving the stride until every
+    waypoint is included exactly once.
+    """
+    order = list(range(0, count, COARSE_COLLISION_STRIDE))
+    if count and (count - 1) % COARSE_COLLISION_STRIDE:
+        order.append(count - 1)
+
+    stride = COARSE_COLLISION_STRIDE
+    while stride > 1:
+        order.extend(range(stride // 2, count, stride))
+        stride //= 2
+
+    # Drop repeats (the last waypoint may be added twice)
+    return tuple(dict.fromkeys(order))
+
 
 class TrajectoryPlanner:
     """Plans collision-free trajectories using interpolation and collision checking."""
 
-    def __init__(self, robot_id: int, check_collisions: bool = True):
+    def __init__(
+        self,
+        robot_id: int,
+        check_collisions: bool = True,
+        obstacle_ids: Optional[List[int]] = None
+    ):
         """
         Initialize trajectory planner.
 
         Args:
             robot_id: PyBullet robot body ID
             check_collisions: Enable collision checking
+            obstacle_ids: Bodies to check the robot against (default: every
+                other body loaded at this point); include robot_id to check
+                self-collisions
+
+        Contacts with a body's base link are not counted as collisions (this
+        includes the ground plane), so bodies without links of their own are
+        never queried. Self-contacts between a link and itself or its parent
+        link are allowed.
         """
         self.robot_id = robot_id
         self.check_collisions = check_collisions
         self.num_joints = p.getNumJoints(robot_id)
 
+        if obstacle_ids is None:
+            obstacle_ids = [
+                body_id
+                for body_id in map(p.getBodyUniqueId, range(p.getNumBodies()))
+                if body_id != robot_id
+            ]
+
+        # Bodies queried per collision check
+        self._obstacle_ids = tuple(
+            body_id for body_id in obstacle_ids if p.getNumJoints(body_id) > 0
+        )
+
         # Get joint indices
         self.joint_indices = []
         self.joint_limits = []
 
+        # Unordered (link, link) pairs of the robot that may touch: each link
+        # with itself and with its parent (from the URDF joint topology)
+        allowed_pairs = {(-1, -1)}
+
         for i in range(self.num_joints):
             joint_info = p.getJointInfo(robot_id, i)
+            parent_index = joint_info[16]
+            allowed_pairs.add((i, i))
+            allowed_pairs.add((min(parent_index, i), max(parent_index, i)))
+
             if joint_info[2] != p.JOINT_FIXED:
                 self.joint_indices.append(i)
                 # Store joint limits
@@ -36,6 +145,19 @@ class TrajectoryPlanner:
                 upper_limit = joint_info[9]
                 self.joint_limits.append((lower_limit, upper_limit))
 
+        self._allowed_pairs = frozenset(allowed_pairs)
+
+        # (joint, value, lower, upper) of the last failed limit check
+        self._last_violation = None
+
+        # Joint indices as one tuple, for resetting all joints in one call
+        self._joint_indices_tuple = tuple(self.joint_indices)
+        self._num_controlled = len(self._joint_indices_tuple)
+
+        # Joint limits as arrays, for checking whole paths at once
+        self._lower_limits = np.array([lower for lower, _ in self.joint_limits], dtype=np.float64)
+        self._upper_limits = np.array([upper for _, upper in self.joint_limits], dtype=np.float64)
+
         print(f"[Trajectory] Initialized with {len(self.joint_indices)} joints")
         print(f"[Trajectory] Collision checking: {check_collisions}")
 
@@ -62,21 +184,33 @@ class TrajectoryPlanner:
         """
         # Validate joint limits
         if not self._check_joint_limits(goal_joints):
+            self._print_limit_violation()
             print("[ERROR] Goal joints exceed joint limits")
             return None
 
+        # Joints present in both configurations
+        start = np.asarray(start_joints, dtype=np.float64)
+        goal = np.asarray(goal_joints, dtype=np.float64)
+        count = min(len(start), len(goal))
+        start, goal = start[:count], goal[:count]
+
+        max_joint_diff = float(np.max(np.abs(goal - start))) if count else 0.0
+
+        # Already at the goal: nothing to interpolate or check
+        if max_joint_diff < AT_GOAL_TOLERANCE:
+            return self._stationary_trajectory(start_joints, 'joint')
+
         # Generate interpolated waypoints
-        waypoints = self._interpolate_joint_path(start_joints, goal_joints, num_waypoints)
+        waypoints = self._interpolate_joint_path(start, goal, num_waypoints).tolist()
 
         # Check collisions if enabled
         if self.check_collisions:
-            for i, waypoint in enumerate(waypoints):
-                if self._is_in_collision(waypoint):
-                    print(f"[ERROR] Collision detected at waypoint {i}/{len(waypoints)}")
-                    return None
+            collision = self._sweep_collisions(waypoints)
+            if collision is not None:
+                print(f"[ERROR] Collision detected at waypoint {collision}/{len(waypoints)}")
+                return None
 
         # Calculate trajectory timing
-        max_joint_diff = max(abs(g - s) for g, s in zip(goal_joints, start_joints))
         duration = self._calculate_duration(max_joint_diff, velocity, acceleration)
 
         return {
@@ -114,98 +248,148 @@ class TrajectoryPlanner:
         # Get start Cartesian position
         start_pos, start_euler = ik_solver.forward_kinematics(start_joints)
 
-        # Interpolate Cartesian path
-        cartesian_waypoints = self._interpolate_cartesian_path(
-            start_pos, goal_pos, num_waypoints
+        # Already at the goal pose: skip the IK path (orientations compared
+        # modulo 2*pi)
+        orn_error = np.subtract(goal_orn, start_euler)
+        orn_error = np.abs((orn_error + np.pi) % (2 * np.pi) - np.pi)
+        if (np.max(np.abs(np.subtract(goal_pos, start_pos))) < AT_GOAL_TOLERANCE
+                and np.max(orn_error) < AT_GOAL_TOLERANCE):
+            trajectory = self._stationary_trajectory(start_joints, 'linear')
+            trajectory['cartesian_path'] = [np.asarray(start_pos, dtype=np.float64).tolist()]
+            return trajectory
+
+        # Interpolate Cartesian path: (N, 6) rows of position and orientation
+        pose_waypoints = self._interpolate_cartesian_path(
+            np.concatenate((start_pos, start_euler)),
+            np.concatenate((goal_pos, goal_orn)),
+            num_waypoints
         )
+        cartesian_waypoints = pose_waypoints[:, :3]
 
-        # Interpolate orientations
-        orientation_waypoints = self._interpolate_cartesian_path(
-            start_euler, goal_orn, num_waypoints
-        )
+        # Convert all Cartesian waypoints to joint configurations in one
+        # batch, each IK solve seeded with the previous solution
+        joint_waypoints = ik_solver.solve_ik_from_euler_batch(pose_waypoints, start_joints)
 
-        # Convert each Cartesian waypoint to joint configuration
-        joint_waypoints = []
-        current_joints = start_joints
+        # Check joint limits of the whole path at once; waypoints before
+        # the first violation are still checked for collisions first
+        limit_violation = self._first_limit_violation(joint_waypoints)
+        num_valid = len(joint_waypoints) if limit_violation is None else limit_violation
 
-        for cart_pos, cart_orn in zip(cartesian_waypoints, orientation_waypoints):
-            # Solve IK
-            joint_solution = ik_solver.solve_ik_from_euler(
-                tuple(cart_pos),
-                tuple(cart_orn),
-                current_joints
-            )
-
-            if joint_solution is None:
-                print(f"[ERROR] IK failed for waypoint at {cart_pos}")
-                return None
-
-            # Check joint limits
-            if not self._check_joint_limits(joint_solution):
-                print(f"[ERROR] Joint limits exceeded at {cart_pos}")
-                return None
-
-            # Check collision
-            if self.check_collisions and self._is_in_collision(joint_solution):
-                print(f"[ERROR] Collision at {cart_pos}")
+        if self.check_collisions:
+            collision = self._sweep_collisions(joint_waypoints[:num_valid].tolist())
+            if collision is not None:
+                print(f"[ERROR] Collision at {cartesian_waypoints[collision].tolist()}")
                 return None
 
-            joint_waypoints.append(joint_solution)
-            current_joints = joint_solution
+        if limit_violation is not None:
+            self._check_joint_limits(joint_waypoints[limit_violation])
+            self._print_limit_violation()
+            print(f"[ERROR] Joint limits exceeded at {cartesian_waypoints[limit_violation].tolist()}")
+            return None
 
         # Calculate duration based on Cartesian distance
         distance = np.linalg.norm(np.array(goal_pos) - np.array(start_pos))
         duration = self._calculate_duration(distance * 1000, velocity, acceleration)  # Convert to mm
 
         return {
-            'waypoints': joint_waypoints,
+            'waypoints': joint_waypoints.tolist(),
             'duration': duration,
             'num_waypoints': len(joint_waypoints),
             'type': 'linear',
-            'cartesian_path': cartesian_waypoints
+            'cartesian_path': cartesian_waypoints.tolist()
+        }
+
+    def _stationary_trajectory(self, joints: List[float], trajectory_type: str) -> Dict:
+        """Zero-duration trajectory holding the given joint configuration."""
+        return {
+            'waypoints': [np.asarray(joints, dtype=np.float64).tolist()],
+            'duration': 0.0,
+            'num_waypoints': 1,
+            'type': trajectory_type
         }
 
     def _interpolate_joint_path(
         self,
-        start: List[float],
-        goal: List[float],
+        start: np.ndarray,
+        goal: np.ndarray,
         num_points: int
-    ) -> List[List[float]]:
-        """Linear interpolation in joint space."""
-        waypoints = []
-        for i in range(num_points):
-            alpha = i / (num_points - 1) if num_points > 1 else 1.0
-            waypoint = [
-                s + alpha * (g - s)
-                for s, g in zip(start, goal)
-            ]
-            waypoints.append(waypoint)
-        return waypoints
+    ) -> np.ndarray:
+        """Linear interpolation in joint space, as a (num_points, joints) array."""
+        if np.array_equal(start, goal):
+            return np.broadcast_to(start, (num_points, len(start))).copy()
+
+        return _linear_path(start, goal, num_points)
 
     def _interpolate_cartesian_path(
         self,
         start: List[float],
         goal: List[float],
         num_points: int
-    ) -> List[List[float]]:
-        """Linear interpolation in Cartesian space."""
-        waypoints = []
-        for i in range(num_points):
-            alpha = i / (num_points - 1) if num_points > 1 else 1.0
-            waypoint = [
-                s + alpha * (g - s)
-                for s, g in zip(start, goal)
-            ]
-            waypoints.append(waypoint)
-        return waypoints
+    ) -> np.ndarray:
+        """Linear interpolation in Cartesian space, as a (num_points, coordinates) array."""
+        start = np.asarray(start, dtype=np.float64)
+        goal = np.asarray(goal, dtype=np.float64)
+
+        # A single point is the goal itself; a degenerate segment (e.g. an
+        # orientation held fixed) is the start repeated
+        if num_points <= 1:
+            return goal[np.newaxis].copy()
+        if np.array_equal(start, goal):
+            return np.broadcast_to(start, (num_points, len(start))).copy()
+        return np.linspace(start, goal, num_points, axis=0)
+
+    def _first_limit_violation(self, joint_path: np.ndarray) -> Optional[int]:
+        """Index of the first waypoint outside the joint limits, or None."""
+        count = min(joint_path.shape[1], len(self._lower_limits))
+        joints = joint_path[:, :count]
+        outside = (joints < self._lower_limits[:count]) | (joints > self._upper_limits[:count])
+
+        violations = np.flatnonzero(outside.any(axis=1))
+        return int(violations[0]) if len(violations) else None
 
     def _check_joint_limits(self, joints: List[float]) -> bool:
-        """Check if joint configuration is within limits."""
-        for i, (joint_val, (lower, upper)) in enumerate(zip(joints, self.joint_limits)):
-            if joint_val < lower or joint_val > upper:
-                print(f"[WARNING] Joint {i} value {joint_val:.3f} outside limits [{lower:.3f}, {upper:.3f}]")
-                return False
-        return True
+        """
+        Check if joint configuration is within limits.
+
+        Nothing is printed here; on failure the first joint outside its
+        limits is kept in _last_violation for the caller to report.
+        """
+        joints = np.asarray(joints, dtype=np.float64)
+        count = min(len(joints), len(self._lower_limits))
+        outside = ((joints[:count] < self._lower_limits[:count])
+                   | (joints[:count] > self._upper_limits[:count]))
+        if not outside.any():
+            return True
+
+        i = int(np.argmax(outside))
+        lower, upper = self.joint_limits[i]
+        self._last_violation = (i, float(joints[i]), lower, upper)
+        return False
+
+    def _print_limit_violation(self):
+        """Print the joint found outside its limits by the last failed check."""
+        i, joint_val, lower, upper = self._last_violation
+        print(f"[WARNING] Joint {i} value {joint_val:.3f} outside limits [{lower:.3f}, {upper:.3f}]")
+
+    def _sweep_collisions(self, waypoints: List[List[float]]) -> Optional[int]:
+        """
+        Check a path for collisions, coarse to fine.
+
+        A colliding stretch of the path is usually hit by the coarse pass
+        after a few checks instead of after sweeping every waypoint before
+        it; collision-free paths still check each waypoint once.
+
+        Args:
+            waypoints: Joint configurations along the path
+
+        Returns:
+            Index of a colliding waypoint (not necessarily the first), or
+            None if the path is collision-free
+        """
+        for index in _coarse_to_fine_order(len(waypoints)):
+            if self._is_in_collision(waypoints[index]):
+                return index
+        return None
 
     def _is_in_collision(self, joints: List[float]) -> bool:
         """
@@ -217,32 +401,36 @@ class TrajectoryPlanner:
         Returns:
             True if in collision, False otherwise
         """
-        # Set robot to test configuration
-        for i, joint_idx in enumerate(self.joint_indices):
-            if i < len(joints):
-                p.resetJointState(self.robot_id, joint_idx, joints[i])
+        # Set robot to test configuration (all joints in a single call)
+        count = min(len(joints), self._num_controlled)
+        p.resetJointStatesMultiDof(
+            self.robot_id,
+            self._joint_indices_tuple[:count],
+            [[value] for value in joints[:count]]
+        )
 
-        # Perform collision detection
-        p.performCollisionDetection()
+        # Query penetrating or touching points per obstacle instead of
+        # running the broadphase over the whole world
+        for body_id in self._obstacle_ids:
+            contact_points = p.getClosestPoints(self.robot_id, body_id, 0.0)
 
-        # Check for contacts
-        contact_points = p.getContactPoints(bodyA=self.robot_id)
+            # Adjacent links of the robot itself naturally touch; links of
+            # other bodies have no allowed pairs
+            allowed_pairs = self._allowed_pairs if body_id == self.robot_id else ()
 
-        # Filter self-collisions (adjacent links are OK)
-        for contact in contact_points:
-            link_a = contact[3]
-            link_b = contact[4]
+            for contact in contact_points:
+                link_a = contact[3]
+                link_b = contact[4]
 
-            # Skip contacts with ground plane or self
-            if link_a == -1 or link_b == -1:
-                continue
+                # Skip contacts with a base link (e.g. the ground plane)
+                if link_a == -1 or link_b == -1:
+                    continue
 
-            # Skip adjacent links (they naturally touch)
-            if abs(link_a - link_b) <= 1:
-                continue
+                if (min(link_a, link_b), max(link_a, link_b)) in allowed_pairs:
+                    continue
 
-            # Collision detected
-            return True
+                # Collision detected
+                return True
 
         return False
 
@@ -263,24 +451,7 @@ class TrajectoryPlanner:
         Returns:
             Duration in seconds
         """
-        # Time to accelerate to max velocity
-        t_accel = velocity / acceleration
-
-        # Distance covered during acceleration
-        d_accel = 0.5 * acceleration * t_accel**2
-
-        # Check if we reach max velocity
-        if 2 * d_accel < distance:
-            # Trapezoidal profile (accel, cruise, decel)
-            d_cruise = distance - 2 * d_accel
-            t_cruise = d_cruise / velocity
-            total_time = 2 * t_accel + t_cruise
-        else:
-            # Triangular profile (accel, decel only)
-            t_accel = math.sqrt(distance / acceleration)
-            total_time = 2 * t_accel
-
-        return total_time
+        return _trapezoid_duration(float(distance), float(velocity), float(acceleration))
 
     def smooth_trajectory(
         self,
@@ -300,21 +471,14 @@ class TrajectoryPlanner:
         if len(waypoints) < 3:
             return waypoints
 
-        smoothed = [waypoints[0]]  # Keep first waypoint
+        points = np.asarray(waypoints, dtype=np.float64)
 
-        for i in range(1, len(waypoints) - 1):
-            prev = np.array(waypoints[i - 1])
-            curr = np.array(waypoints[i])
-            next_wp = np.array(waypoints[i + 1])
-
-            # Average with neighbors
-            smoothed_point = (
-                (1 - smoothing_factor) * curr +
-                smoothing_factor * 0.5 * (prev + next_wp)
-            )
-
-            smoothed.append(smoothed_point.tolist())
-
-        smoothed.append(waypoints[-1])  # Keep last waypoint
+        # Average every interior waypoint with its neighbors at once
+        # (a 3-tap filter over the whole path)
+        smoothed = (
+            (1 - smoothing_factor) * points[1:-1] +
+            smoothing_factor * 0.5 * (points[:-2] + points[2:])
+        )
 
-        return smoothed
+        # Keep first and last waypoint
+        return [waypoints[0]] + smoothed.tolist() + [waypoints[-1]]
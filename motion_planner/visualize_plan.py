@@ -8,13 +8,61 @@ import matplotlib.pyplot as plt
 import numpy as np
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; the standard json module is used instead
+    orjson = None
+
 
 def load_motion_plan(json_path):
     """Load motion plan from JSON file."""
+    if orjson is not None:
+        return orjson.loads(Path(json_path).read_bytes())
+
     with open(json_path, 'r') as f:
         return json.load(f)
 
 
+def collect_goal_waypoints(trajectories):
+    """
+    Concatenate the motion waypoints of a GOAL into time and joint arrays.
+
+    Args:
+        trajectories: Trajectory dictionaries of the GOAL
+
+    Returns:
+        Tuple of (time stamps, (N, joints) waypoints), or (None, None) if
+        the GOAL has no motion with more than one waypoint
+    """
+    # First pass: which trajectories move, and how many waypoints in total
+    motions = [
+        (traj['waypoints'], traj.get('duration', 0))
+        for traj in trajectories
+        if traj and 'waypoints' in traj and len(traj['waypoints']) > 1
+    ]
+    if not motions:
+        return None, None
+
+    total = sum(len(waypoints) for waypoints, _ in motions)
+    num_joints = len(motions[0][0][0])
+    time_array = np.empty(total)
+    waypoints_array = np.empty((total, num_joints))
+
+    # Second pass: fill the preallocated arrays slice by slice
+    offset = 0
+    current_time = 0.0
+    for waypoints, duration in motions:
+        count = len(waypoints)
+        time_array[offset:offset + count] = np.linspace(
+            current_time, current_time + duration, count
+        )
+        waypoints_array[offset:offset + count] = waypoints
+        offset += count
+        current_time += duration
+
+    return time_array, waypoints_array
+
+
 def visualize_motion_plan(motion_plan, save_path=None):
     """
     Visualize motion plan as joint angle trajectories.
@@ -36,6 +84,10 @@ def visualize_motion_plan(motion_plan, save_path=None):
 
     fig.suptitle('Joint Angle Trajectories', fontsize=16, fontweight='bold')
 
+    # More than about two points per pixel column only overlap, so longer
+    # GOALs are plotted with a uniform stride (always ending at the goal)
+    max_points = int(fig.get_size_inches()[0] * fig.dpi * 2)
+
     for goal_idx, goal_data in enumerate(motion_plan['goals']):
         ax = axes[goal_idx]
 
@@ -43,42 +95,31 @@ def visualize_motion_plan(motion_plan, save_path=None):
         trajectories = goal_data['trajectories']
 
         # Collect all waypoints for this goal
-        all_waypoints = []
-        time_stamps = []
-        current_time = 0.0
-
-        for traj in trajectories:
-            if traj and 'waypoints' in traj:
-                waypoints = traj['waypoints']
-                duration = traj.get('duration', 0)
-
-                # Generate time stamps
-                num_waypoints = len(waypoints)
-                if num_waypoints > 1:
-                    traj_time = np.linspace(current_time, current_time + duration, num_waypoints)
-                    time_stamps.extend(traj_time)
-                    all_waypoints.extend(waypoints)
-                    current_time += duration
-
-        if not all_waypoints:
+        time_array, waypoints_array = collect_goal_waypoints(trajectories)
+
+        if waypoints_array is None:
             ax.text(0.5, 0.5, 'No motion data', ha='center', va='center', fontsize=12)
             ax.set_title(f'GOAL: {goal_name}')
             continue
 
-        # Convert to numpy array
-        waypoints_array = np.array(all_waypoints)
-        time_array = np.array(time_stamps)
+        count = len(time_array)
+        if count > max_points:
+            stride = count // max_points
+            samples = np.unique(np.r_[0:count:stride, count - 1])
+            time_array = time_array[samples]
+            waypoints_array = waypoints_array[samples]
 
         num_joints = waypoints_array.shape[1]
+        degrees_array = np.degrees(waypoints_array)
 
         # Plot each joint
         colors = plt.cm.tab10(np.linspace(0, 1, num_joints))
         for joint_idx in range(num_joints):
-            joint_angles = waypoints_array[:, joint_idx]
-            ax.plot(time_array, np.degrees(joint_angles),
+            ax.plot(time_array, degrees_array[:, joint_idx],
                    label=f'Joint {joint_idx + 1}',
                    color=colors[joint_idx],
-                   linewidth=2)
+                   linewidth=2,
+                   rasterized=bool(save_path))
 
         ax.set_xlabel('Time (seconds)', fontsize=11)
         ax.set_ylabel('Joint Angle (degrees)', fontsize=11)
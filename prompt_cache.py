@@ -0,0 +1,192 @@
+"""
+Prompt Result Cache
+Reuses LLM results for identical requirements, and optionally for near-duplicates.
+"""
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import zlib
+from array import array
+from operator import mul
+from typing import Dict, Any, Optional
+
+
+EMBEDDING_DIM = 256
+
+# Entries kept per cache; the oldest are dropped first
+DEFAULT_MAX_ENTRIES = 1000
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse whitespace."""
+    return _WHITESPACE_RE.sub(' ', text.strip().lower())
+
+
+def embed_text(text: str) -> array:
+    """
+    Embed text as a normalized vector of hashed character trigrams.
+
+    Args:
+        text: Input text (Korean or English)
+
+    Returns:
+        Unit-length float vector of size EMBEDDING_DIM
+    """
+    padded = f" {normalize_text(text)} "
+    vector = array('f', bytes(4 * EMBEDDING_DIM))
+
+    for i in range(len(padded) - 2):
+        trigram = padded[i:i + 3].encode('utf-8')
+        vector[zlib.crc32(trigram) % EMBEDDING_DIM] += 1.0
+
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm > 0:
+        for i in range(EMBEDDING_DIM):
+            vector[i] /= norm
+
+    return vector
+
+
+class PromptCache:
+    """Caches LLM results keyed by normalized requirement text."""
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        scope: str = "",
+        threshold: Optional[float] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        """
+        Initialize cache.
+
+        Args:
+            path: SQLite database path (default: in-memory)
+            scope: Extra key part, such as the model name, so results of
+                different models are kept apart
+            threshold: Minimum cosine similarity to also reuse the result of
+                a similar requirement (0.0 to 1.0). None (default) only
+                reuses results of the same normalized text. Character
+                trigrams do not see negation or swapped names, so enable
+                this only where a near-miss is harmless.
+            max_entries: Maximum number of cached results
+        """
+        self.scope = scope
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path)
+
+        # Caches written before results were keyed by text have no key
+        # column; their rows cannot be deduplicated, so start over
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(prompt_cache)")]
+        if columns and "key" not in columns:
+            self.conn.execute("DROP TABLE prompt_cache")
+
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS prompt_cache ("
+            "id INTEGER PRIMARY KEY, "
+            "key TEXT NOT NULL UNIQUE, "
+            "text TEXT NOT NULL, "
+            "numbers TEXT NOT NULL, "
+            "embedding BLOB NOT NULL, "
+            "response TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+        # Entries by key, oldest first, kept in memory for fast lookup
+        self._entries = {}
+        for key, numbers, blob, response in self.conn.execute(
+            "SELECT key, numbers, embedding, response FROM prompt_cache ORDER BY id"
+        ):
+            embedding = array('f')
+            embedding.frombytes(blob)
+            self._entries[key] = (numbers, embedding, response)
+
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up cached result for requirement text.
+
+        With a similarity threshold, falls back to the most similar cached
+        requirement. Requirements whose numbers differ (e.g. coordinates)
+        never match, however similar the rest of the text is.
+
+        Args:
+            text: Requirement text
+
+        Returns:
+            Copy of cached result, or None on cache miss
+        """
+        entry = self._entries.get(self._key(text))
+        if entry is not None:
+            return json.loads(entry[2])
+
+        if self.threshold is None or not self._entries:
+            return None
+
+        numbers = self._numbers_key(text)
+        embedding = embed_text(text)
+
+        best_score = -1.0
+        best_response = None
+
+        for cached_numbers, cached_embedding, response in self._entries.values():
+            if cached_numbers != numbers:
+                continue
+            score = sum(map(mul, embedding, cached_embedding))
+            if score > best_score:
+                best_score = score
+                best_response = response
+
+        if best_response is None or best_score < self.threshold:
+            return None
+
+        return json.loads(best_response)
+
+    def put(self, text: str, result: Dict[str, Any]):
+        """
+        Store result for requirement text, replacing an earlier result for
+        the same text.
+
+        Args:
+            text: Requirement text
+            result: JSON-serializable LLM result
+        """
+        key = self._key(text)
+        numbers = self._numbers_key(text)
+        embedding = embed_text(text)
+        response = json.dumps(result, ensure_ascii=False)
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO prompt_cache (key, text, numbers, embedding, response) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, text, numbers, embedding.tobytes(), response)
+        )
+
+        # Replaced entries move to the end, as their row gets a new id
+        self._entries.pop(key, None)
+        self._entries[key] = (numbers, embedding, response)
+
+        if len(self._entries) > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM prompt_cache WHERE id NOT IN "
+                "(SELECT id FROM prompt_cache ORDER BY id DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+        self.conn.commit()
+
+    def _key(self, text: str) -> str:
+        """Exact-match key of requirement text within the cache scope."""
+        key_text = f"{self.scope}|{normalize_text(text)}"
+        return hashlib.sha256(key_text.encode('utf-8')).hexdigest()
+
+    def _numbers_key(self, text: str) -> str:
+        """Extract numeric tokens that must match exactly."""
+        return ",".join(_NUMBER_RE.findall(text))
@@ -155,6 +155,12 @@ Examples:
     # Initialize similarity analyzer
     analyzer = RobotSimilarityAnalyzer(str(robots_db_path))
 
+    # Robots by case-insensitive (manufacturer, model); the first entry of
+    # the database wins if a robot is listed twice
+    robots_by_key = {}
+    for robot in analyzer.robots:
+        robots_by_key.setdefault((robot.manufacturer.lower(), robot.model.lower()), robot)
+
     # Compare mode
     if args.compare:
         if not all([args.robot1_mfr, args.robot1_model, args.robot2_mfr, args.robot2_model]):
@@ -164,16 +170,8 @@ Examples:
             sys.exit(1)
 
         # Find the two robots in database
-        robot1 = None
-        robot2 = None
-
-        for robot in analyzer.robots:
-            if (robot.manufacturer.lower() == args.robot1_mfr.lower() and
-                robot.model.lower() == args.robot1_model.lower()):
-                robot1 = robot
-            if (robot.manufacturer.lower() == args.robot2_mfr.lower() and
-                robot.model.lower() == args.robot2_model.lower()):
-                robot2 = robot
+        robot1 = robots_by_key.get((args.robot1_mfr.lower(), args.robot1_model.lower()))
+        robot2 = robots_by_key.get((args.robot2_mfr.lower(), args.robot2_model.lower()))
 
         if not robot1:
             print(f"[ERROR] Robot not found: {args.robot1_mfr} {args.robot1_model}")
@@ -207,12 +205,7 @@ Examples:
         sys.exit(1)
 
     # Find target robot in database
-    target_robot = None
-    for robot in analyzer.robots:
-        if (robot.manufacturer.lower() == args.manufacturer.lower() and
-            robot.model.lower() == args.model.lower()):
-            target_robot = robot
-            break
+    target_robot = robots_by_key.get((args.manufacturer.lower(), args.model.lower()))
 
     if not target_robot:
         print(f"[ERROR] Robot not found in database: {args.manufacturer} {args.model}")
@@ -2,21 +2,28 @@
 LLM-based TDL Document Generator
 Uses Gemini API to generate complete TDL documents from analyzed requirements.
 """
+import re
+from typing import Iterator
+
 from llm_client import GeminiClient
 from analyzer import RequirementAnalysis
 
 
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+
 class LLMTDLGenerator:
     """Generates TDL documents using LLM."""
 
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, response_cache: bool = True):
         """
         Initialize generator with LLM client.
 
         Args:
             api_key: Gemini API key. If None, reads from environment.
+            response_cache: Reuse cached LLM responses for identical prompts
         """
-        self.llm_client = GeminiClient(api_key)
+        self.llm_client = GeminiClient(api_key, response_cache=response_cache)
 
     def generate(self, analysis: RequirementAnalysis) -> str:
         """
@@ -50,6 +57,34 @@ class LLMTDLGenerator:
         except Exception as e:
             raise Exception(f"LLM TDL generation failed: {e}")
 
+    def stream_generate(self, analysis: RequirementAnalysis) -> Iterator[str]:
+        """
+        Generate TDL document from requirement analysis, yielding raw text
+        chunks as the LLM produces them.
+
+        Pass the joined chunks through finalize_tdl afterwards.
+
+        Args:
+            analysis: Analyzed requirement
+
+        Yields:
+            TDL text chunks
+
+        Raises:
+            Exception: If TDL generation fails
+        """
+        try:
+            yield from self.llm_client.stream_tdl(
+                task_description=analysis.task_description,
+                actions=analysis.actions,
+                objects=analysis.objects,
+                locations=analysis.locations,
+                constraints=analysis.constraints,
+                coordinates=analysis.coordinates
+            )
+        except Exception as e:
+            raise Exception(f"LLM TDL generation failed: {e}")
+
     def validate_tdl(self, tdl_content: str) -> bool:
         """
         Validate TDL document structure.
@@ -93,10 +128,11 @@ class LLMTDLGenerator:
             in_code_block = False
 
             for line in lines:
-                if line.strip().startswith("```"):
+                stripped = line.strip()
+                if stripped.startswith("```"):
                     in_code_block = not in_code_block
                     continue
-                if not in_code_block or line.strip():
+                if not in_code_block or stripped:
                     cleaned_lines.append(line)
 
             tdl_content = "\n".join(cleaned_lines)
@@ -104,9 +140,8 @@ class LLMTDLGenerator:
         # Ensure consistent line endings
         tdl_content = tdl_content.replace("\r\n", "\n")
 
-        # Remove excessive blank lines
-        while "\n\n\n" in tdl_content:
-            tdl_content = tdl_content.replace("\n\n\n", "\n\n")
+        # Remove excessive blank lines (in a single pass)
+        tdl_content = _BLANK_LINES_RE.sub("\n\n", tdl_content)
 
         return tdl_content.strip() + "\n"
 
@@ -126,11 +161,24 @@ class LLMTDLGenerator:
         # Generate TDL
         tdl_content = self.generate(analysis)
 
+        return self.finalize_tdl(tdl_content)
+
+    def finalize_tdl(self, tdl_content: str, validate: bool = True) -> str:
+        """
+        Post-process and optionally validate already generated TDL.
+
+        Args:
+            tdl_content: Raw TDL content from LLM
+            validate: Run validation checks (a failure is only reported)
+
+        Returns:
+            Cleaned TDL document
+        """
         # Post-process
         tdl_content = self.post_process_tdl(tdl_content)
 
         # Validate
-        if not self.validate_tdl(tdl_content):
+        if validate and not self.validate_tdl(tdl_content):
             print("[WARNING]  Warning: TDL validation failed, but continuing...")
 
         return tdl_content
@@ -172,7 +220,10 @@ class LLMTDLGenerator:
 피드백을 반영하여 개선된 TDL 문서를 생성해주세요. TDL 문서만 출력하고 다른 설명은 포함하지 마세요."""
 
         try:
-            response = self.llm_client.generate_content(prompt, temperature=0.5, max_tokens=3000)
+            # Asking again should give a new document, not the cached one
+            response = self.llm_client.generate_content(
+                prompt, temperature=0.5, max_tokens=3000, cache=False
+            )
             tdl_content = self.post_process_tdl(response)
             print("[OK] TDL regeneration completed")
             return tdl_content